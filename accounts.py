@@ -0,0 +1,187 @@
+# accounts.py
+import os
+import time
+import hmac
+import sqlite3
+import secrets
+import hashlib
+import threading
+from flask import Response, request, jsonify
+
+# ---------------------- CONFIG ----------------------
+# "sqlite" shares accounts and sessions between gunicorn workers; "memory"
+# keeps them in the process (dev server / single worker only).
+ACCOUNTS_BACKEND = os.environ.get("ACCOUNTS_BACKEND", "sqlite")
+ACCOUNTS_DB = os.environ.get("ACCOUNTS_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "accounts.db"))
+SESSION_TTL = int(os.environ.get("SESSION_TTL", 7 * 24 * 3600))
+# Login also sets this cookie, so browser downloads of the Flask routes
+# (/export, /report.pdf) carry the session the dashboard store holds
+SESSION_COOKIE = "weather_session"
+# Flask routes that need a session: data downloads, reports and the API
+PROTECTED_PREFIXES = ("/export/", "/report.pdf", "/api/")
+
+# scrypt cost: ~50 ms and 16 MB per hash. Only signup/login pay it; page
+# renders validate the session token with a single lookup.
+SCRYPT_PARAMS = {"n": 2 ** 14, "r": 8, "p": 1}
+
+# ---------------------- PASSWORDS ----------------------
+def hash_password(password, salt=None):
+    salt = salt or secrets.token_bytes(16)
+    digest = hashlib.scrypt(password.encode("utf-8"), salt=salt, **SCRYPT_PARAMS)
+    return salt, digest
+
+
+def verify_password(password, salt, digest):
+    return hmac.compare_digest(hash_password(password, salt)[1], digest)
+
+
+def _token_key(token):
+    # Only a digest of the token is stored, so a leaked database can't be
+    # replayed as live sessions.
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+# ---------------------- BACKENDS ----------------------
+class MemoryAccounts:
+    # Per-process accounts and sessions.
+
+    def __init__(self):
+        self._users = {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create_user(self, email, password):
+        salt, digest = hash_password(password)
+        with self._lock:
+            if email in self._users:
+                return False
+            self._users[email] = (salt, digest)
+            return True
+
+    def check_password(self, email, password):
+        record = self._users.get(email)
+        return record is not None and verify_password(password, *record)
+
+    def create_session(self, email):
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._sessions[_token_key(token)] = (email, time.time() + SESSION_TTL)
+        return token
+
+    def get_session(self, token):
+        if not token:
+            return None
+        session = self._sessions.get(_token_key(token))
+        if session is None or session[1] < time.time():
+            return None
+        return session[0]
+
+    def delete_session(self, token):
+        if token:
+            with self._lock:
+                self._sessions.pop(_token_key(token), None)
+
+
+class SQLiteAccounts(MemoryAccounts):
+    # Shared by all worker processes through one SQLite file in WAL mode:
+    # readers never block on a writer, so session lookups stay cheap while
+    # someone signs up.
+
+    def __init__(self, path=ACCOUNTS_DB):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS users ("
+                       "email TEXT PRIMARY KEY, salt BLOB NOT NULL, digest BLOB NOT NULL)")
+            db.execute("CREATE TABLE IF NOT EXISTS sessions ("
+                       "token TEXT PRIMARY KEY, email TEXT NOT NULL, expires REAL NOT NULL)")
+            db.execute("DELETE FROM sessions WHERE expires < ?", (time.time(),))
+
+    def _connect(self):
+        # One connection per thread (and per process: never reuse across fork)
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def create_user(self, email, password):
+        salt, digest = hash_password(password)
+        try:
+            with self._connect() as db:
+                db.execute("INSERT INTO users VALUES (?, ?, ?)", (email, salt, digest))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def check_password(self, email, password):
+        row = self._connect().execute(
+            "SELECT salt, digest FROM users WHERE email = ?", (email,)).fetchone()
+        return row is not None and verify_password(password, *row)
+
+    def create_session(self, email):
+        token = secrets.token_urlsafe(32)
+        with self._connect() as db:
+            db.execute("INSERT INTO sessions VALUES (?, ?, ?)",
+                       (_token_key(token), email, time.time() + SESSION_TTL))
+        return token
+
+    def get_session(self, token):
+        if not token:
+            return None
+        row = self._connect().execute(
+            "SELECT email FROM sessions WHERE token = ? AND expires >= ?",
+            (_token_key(token), time.time())).fetchone()
+        return row[0] if row else None
+
+    def delete_session(self, token):
+        if token:
+            with self._connect() as db:
+                db.execute("DELETE FROM sessions WHERE token = ?", (_token_key(token),))
+
+
+def make_accounts(backend=ACCOUNTS_BACKEND):
+    if backend == "sqlite":
+        return SQLiteAccounts()
+    return MemoryAccounts()
+
+# ---------------------- ROUTES ----------------------
+def request_token():
+    # API clients send "Authorization: Bearer <token>", browsers the cookie
+    header = request.headers.get("Authorization", "")
+    if header.startswith("Bearer "):
+        return header[len("Bearer "):].strip()
+    return request.cookies.get(SESSION_COOKIE)
+
+
+def set_session_cookie(response, token):
+    response.set_cookie(SESSION_COOKIE, token, max_age=SESSION_TTL, httponly=True,
+                        samesite="Lax", secure=request.is_secure)
+
+
+def clear_session_cookie(response):
+    # set_cookie only: Dash's callback response wraps Flask's with no delete_cookie
+    response.set_cookie(SESSION_COOKIE, "", max_age=0, expires=0, httponly=True,
+                        samesite="Lax", secure=request.is_secure)
+
+
+def register_session_routes(app, accounts, prefixes=PROTECTED_PREFIXES):
+
+    @app.server.before_request
+    def require_session():
+        if request.path.startswith(prefixes) and not accounts.get_session(request_token()):
+            return Response('{"error": "login required"}', status=401, mimetype="application/json",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+    # Token for scripts and services: POST email and password (form or JSON)
+    @app.server.route("/session", methods=["POST"])
+    def create_session():
+        form = request.get_json(silent=True) or request.form
+        email, password = form.get("email"), form.get("password")
+        if not email or not password or not accounts.check_password(email, password):
+            return jsonify(error="Invalid login"), 401
+        token = accounts.create_session(email)
+        response = jsonify(token=token, expires_in=SESSION_TTL)
+        set_session_cookie(response, token)
+        return response
@@ -0,0 +1,152 @@
+# api.py
+# Read-only JSON access to the loaded data, for services that would
+# otherwise scrape the dashboard:
+#
+#   /api/v1/options
+#   /api/v1/forecasts?cities=Chicago&disasters=Flood&severities=High,Very High
+#   /api/v1/forecasts?from=2026-11&to=2027-02&limit=500&offset=500
+#   /api/v1/weather?cities=London&years=2027
+#
+# Filters are the ones /export takes (see data_export.py) plus a from/to
+# month range. Answers are cached per data version and carry an ETag, so
+# a repeated query is a dict lookup, or a bodyless 304 with If-None-Match.
+#
+# Requests need a session token (accounts.py): POST email and password to
+# /session, then send "Authorization: Bearer <token>".
+import os
+import json
+import hashlib
+from urllib.parse import urlencode
+import numpy as np
+import pandas as pd
+from flask import Response, request, abort
+from werkzeug.exceptions import HTTPException
+import data_store
+from cache import LRUCache, make_key
+from data_export import DATASETS, parse_filters, split_filters
+
+# ---------------------- CONFIG ----------------------
+API_PREFIX = "/api/v1"
+API_CACHE_SIZE = int(os.environ.get("API_CACHE_SIZE", 512))
+# Clients may reuse an answer this long before revalidating with the ETag
+API_MAX_AGE = int(os.environ.get("API_MAX_AGE", 60))
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+api_cache = LRUCache(API_CACHE_SIZE)
+
+# ---------------------- QUERIES ----------------------
+def parse_month(value):
+    # "2027-03" -> 202703
+    try:
+        year, month = value.split("-")
+        stamp = int(year) * 100 + int(month)
+    except ValueError:
+        abort(400, f"Months must look like YYYY-MM, got {value!r}")
+    if not 1 <= stamp % 100 <= 12:
+        abort(400, f"Months must look like YYYY-MM, got {value!r}")
+    return stamp
+
+
+def parse_page():
+    try:
+        limit = int(request.args.get("limit", PAGE_SIZE))
+        offset = int(request.args.get("offset", 0))
+    except ValueError:
+        abort(400, "limit and offset must be integers")
+    if not 1 <= limit <= MAX_PAGE_SIZE or offset < 0:
+        abort(400, f"limit must be between 1 and {MAX_PAGE_SIZE}, offset at least 0")
+    return limit, offset
+
+
+def query_positions(index, filters, months=None):
+    # Row positions matching every filter, in frame order. Categorical
+    # columns are compared by code, without materialising the strings.
+    positions, rest = split_filters(index, filters)
+    frame = index.frame
+    keep = np.ones(len(positions), dtype=bool)
+    for column, values in rest.items():
+        series = frame[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            keep &= np.isin(series.cat.codes.to_numpy()[positions], series.cat.categories.get_indexer(values))
+        else:
+            keep &= np.isin(series.to_numpy()[positions], values)
+    if months:
+        low, high = months
+        stamp = frame["Year"].to_numpy()[positions].astype("int32") * 100 + frame["Month_num"].to_numpy()[positions]
+        keep &= (stamp >= low) & (stamp <= high)
+    return positions[keep]
+
+
+def query_page(dataset):
+    get_index, columns = DATASETS[dataset]
+    index = get_index()
+    filters = parse_filters(index.frame)
+    months = None
+    if request.args.get("from") or request.args.get("to"):
+        months = (parse_month(request.args.get("from", "0000-01")),
+                  parse_month(request.args.get("to", "9999-12")))
+    limit, offset = parse_page()
+
+    positions = query_positions(index, filters, months)
+    page = index.frame.take(positions[offset:offset + limit])[columns]
+    following = None
+    if offset + limit < len(positions):
+        # flat=False: repeated parameters (cities=A&cities=B) all carry over
+        args = {**request.args.to_dict(flat=False), "offset": [offset + limit]}
+        following = f"{request.path}?{urlencode(args, doseq=True)}"
+    return {
+        "dataset": dataset,
+        "total": len(positions),
+        "offset": offset,
+        "limit": limit,
+        "next": following,
+        "data": page.to_dict("records"),
+    }
+
+
+def options():
+    weather = data_store.get_weather_options()
+    return {
+        "datasets": list(DATASETS),
+        "cities": weather["cities"],
+        "years": data_store.get_threshold_cube().years(),
+        "disasters": weather["disasters"],
+        "severities": data_store.severity_order,
+    }
+
+# ---------------------- RESPONSES ----------------------
+def cached_json(build):
+    # Keyed by data version, path and query string: a reload makes every
+    # earlier answer unreachable and the LRU ages them out.
+    key = make_key("api", (data_store.data_version, request.path, request.args.to_dict(flat=False)))
+    body = api_cache.get(key)
+    if body is None:
+        try:
+            body = json.dumps(build(), separators=(",", ":"), default=str)
+        except HTTPException as e:
+            return Response(json.dumps({"error": e.description}), status=e.code, mimetype="application/json")
+        api_cache.set(key, body)
+
+    response = Response(body, mimetype="application/json")
+    # Weak: the compression hook may re-encode the body on the way out
+    response.set_etag(hashlib.sha1(body.encode("utf-8")).hexdigest(), weak=True)
+    # Answers need a session (see accounts.py): browsers may keep them,
+    # shared caches must not
+    response.cache_control.private = True
+    response.cache_control.max_age = API_MAX_AGE
+    return response.make_conditional(request)
+
+
+def register_api_routes(app):
+
+    @app.server.route(f"{API_PREFIX}/options")
+    def api_options():
+        return cached_json(options)
+
+    @app.server.route(f"{API_PREFIX}/<dataset>")
+    def api_query(dataset):
+        if dataset not in DATASETS:
+            return Response(json.dumps({"error": f"Unknown dataset {dataset!r}"}), status=404,
+                            mimetype="application/json")
+        return cached_json(lambda: query_page(dataset))
@@ -2,17 +2,30 @@ import dash
 from dash import html, dcc, Input, Output, State
 import dash_bootstrap_components as dbc
 import os
+import threading
+import data_store
 from bar_charts import create_bar_layout, register_bar_callbacks
 from pie_chart import create_pie_layout, register_pie_callbacks
 from surface_plots import create_surface_layout, register_surface_callbacks
 from treemap_app import create_treemap_layout, register_treemap_callbacks
 from rr import create_map_layout, register_map_callbacks
-
-# ---------------------- MOCK DB ----------------------
-users_db = {}
+from report import register_report_routes
+from data_export import register_data_export_routes
+from api import register_api_routes
+from data_watcher import start_data_watcher
+from accounts import make_accounts, register_session_routes, set_session_cookie, clear_session_cookie
+from metrics import register_metrics, timed
+from compact import register_compression
+
+# ---------------------- ACCOUNTS ----------------------
+# Users and sessions live server-side (SQLite by default, see accounts.py);
+# the current-user store only carries the session token.
+accounts = make_accounts()
 
 # ---------------------- APP INIT ----------------------
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.LUX], suppress_callback_exceptions=True)
+# WSGI entry point: gunicorn app:server (see gunicorn.conf.py)
+server = app.server
 
 app.layout = html.Div([
     dcc.Store(id="current-user", data={"logged_in": False, "email": ""}),
@@ -94,32 +107,54 @@ def rr_page():
     ])
 
 # ---------------------- ROUTING ----------------------
+pages = {
+    "/home": home_page,
+    "/bar-charts": bar_charts_page,
+    "/treemaps": treemaps_page,
+    "/pie-chart": pie_chart_page,
+    "/3d-surface": surface_plots_page,
+    "/rr-map": rr_page,
+}
+
+# Layouts only change when the data does, so each page's component tree is
+# built once per data version and reused across navigations and users.
+_page_cache = {}
+# gthread workers serve several requests at once; misses are built and
+# stale versions dropped under the lock
+_page_lock = threading.Lock()
+
+
+def cached_page(path):
+    key = (path, data_store.data_version)
+    page = _page_cache.get(key)
+    if page is None:
+        with _page_lock:
+            page = _page_cache.get(key)
+            if page is None:
+                page = pages[path]()
+                for stale in [k for k in _page_cache if k[1] != key[1]]:
+                    del _page_cache[stale]
+                _page_cache[key] = page
+    return page
+
 
 @app.callback(
     Output("page-content", "children"),
     Input("url", "pathname"),
     Input("current-user", "data")
 )
+@timed("render-page")
 def render_page(path, user):
-    if not user["logged_in"]:
+    token = (user or {}).get("token")
+    if not accounts.get_session(token):
         return signup_login_page()
 
-    if path in ["/", "/home"]:
-        return home_page()
-    if path == "/bar-charts":
-        return bar_charts_page()
-    if path == "/treemaps":
-        return treemaps_page()
-    if path == "/pie-chart":
-        return pie_chart_page()
-    if path == "/3d-surface":
-        return surface_plots_page()
-    if path == "/rr-map":
-        return rr_page()
     if path == "/logout":
+        accounts.delete_session(token)
+        clear_session_cookie(dash.callback_context.response)
         return signup_login_page()
 
-    return home_page()
+    return cached_page(path if path in pages else "/home")
 
 # ---------------------- AUTH ----------------------
 
@@ -133,6 +168,7 @@ def render_page(path, user):
     State("current-user", "data"),
     prevent_initial_call=True
 )
+@timed("auth")
 def auth(signup, login, email, password, current):
     ctx = dash.callback_context
     button = ctx.triggered[0]["prop_id"].split(".")[0]
@@ -141,15 +177,18 @@ def auth(signup, login, email, password, current):
         return current, "Enter email & password"
 
     if button == "signup-btn":
-        if email in users_db:
+        if not accounts.create_user(email, password):
             return current, "User already exists"
-        users_db[email] = password
-        return {"logged_in": True, "email": email}, "Signup successful!"
+        token = accounts.create_session(email)
+        set_session_cookie(ctx.response, token)
+        return {"logged_in": True, "email": email, "token": token}, "Signup successful!"
 
     if button == "login-btn":
-        if email not in users_db or users_db[email] != password:
+        if not accounts.check_password(email, password):
             return current, "Invalid login"
-        return {"logged_in": True, "email": email}, "Login successful!"
+        token = accounts.create_session(email)
+        set_session_cookie(ctx.response, token)
+        return {"logged_in": True, "email": email, "token": token}, "Login successful!"
 
     return current, ""
 
@@ -160,9 +199,19 @@ register_pie_callbacks(app)
 register_surface_callbacks(app)
 register_treemap_callbacks(app)
 register_map_callbacks(app)
+# /export, /report.pdf and /api/v1 need a session like the dashboard does
+register_session_routes(app, accounts)
+register_report_routes(app)
+register_data_export_routes(app)
+register_api_routes(app)
+register_metrics(app)
+# After metrics, so its hook runs first and metrics see the bytes on the wire
+register_compression(app)
 
 # ---------------------- RUN ----------------------
 if __name__ == "__main__":
+    # Under gunicorn the watcher is started per worker in post_fork
+    start_data_watcher()
     app.run(
         host="0.0.0.0",
         port=int(os.environ.get("PORT", 8050)),
@@ -1,18 +1,24 @@
-from dash import html, dcc, Input, Output, State, no_update
+from dash import html, dcc, Input, Output, State, Patch, ctx
 import dash_bootstrap_components as dbc
 import plotly.express as px
-import plotly.io as pio
-import pandas as pd
+from cache import figure_cache
+from metrics import timed
+from compact import compact_outputs, compact_figure
+from data_store import get_weather_options, get_weather_index, get_weather_stats, severity_order, on_reload, affects
+from exports import create_export_components, register_export_callbacks
 
-df_weather = pd.read_csv("predicted_crime_corrected.csv")
 
-severity_order = ["Low", "Medium", "High", "Very High"]
+def disaster_colors():
+    # One fixed colour per disaster, so adding or removing one never
+    # recolours the others
+    palette = px.colors.qualitative.Plotly
+    disasters = get_weather_options()["disasters"]
+    return {disaster: palette[i % len(palette)] for i, disaster in enumerate(disasters)}
 
 
 def create_bar_layout():
-    cities = df_weather["City"].unique()
-    years = sorted(df_weather["Month"].str.split("-").str[0].unique())
-    disasters = df_weather["Disaster"].unique()
+    options = get_weather_options()
+    cities, years, disasters = options["cities"], options["years"], options["disasters"]
 
     return html.Div([
         html.H2("Bar Charts: Weather Forecast by City and Year"),
@@ -41,85 +47,152 @@ def create_bar_layout():
 
         dcc.Graph(id="bar-chart"),
         html.Div(id="bar-chart-writeup", style={"margin": "10px 0"}),
+        # Selection and trace layout behind the figure currently shown
+        dcc.Store(id="bar-last"),
 
         dbc.Button("Download PDF", id="btn-pdf-bar", color="danger", style={"margin-right": "10px"}),
         dbc.Button("Download PNG", id="btn-png-bar", color="success"),
 
         dcc.Download(id="download-pdf-bar"),
-        dcc.Download(id="download-png-bar")
+        dcc.Download(id="download-png-bar"),
+        create_export_components("bar")
     ])
 
 
-def register_bar_callbacks(app):
-
-    @app.callback(
-        Output("bar-chart", "figure"),
-        Output("bar-chart-writeup", "children"),
-        Input("city-dropdown", "value"),
-        Input("year-dropdown", "value"),
-        Input("disaster-checkbox", "value")
+def bar_writeup(rows):
+    # Merges the selection's precomputed (City, Year, Disaster) rows
+    highest = max(rows, key=lambda r: (r["max"], -r["max_row"]))
+    lowest = min(rows, key=lambda r: (r["min"], r["min_row"]))
+    rising = max(rows, key=lambda r: r["trend"])
+    months = sum(r["months"] for r in rows)
+
+    parts = [
+        f"Highest: {highest['Disaster']} in {highest['City']} "
+        f"({highest['max']} {highest['Unit']})",
+        f"Lowest: {lowest['Disaster']} in {lowest['City']} "
+        f"({lowest['min']} {lowest['Unit']})",
+    ]
+    # An average only means something within one unit
+    if len({r["Unit"] for r in rows}) == 1:
+        mean = sum(r["mean"] * r["months"] for r in rows) / months
+        parts.append(f"Average: {mean:.2f} {highest['Unit']}")
+    if rising["trend"] > 0:
+        parts.append(f"Steepest rise: {rising['Disaster']} in {rising['City']} "
+                     f"(+{rising['trend']:.2f} {rising['Unit']}/month)")
+    parts.append(f"Above threshold: {sum(r['above'] for r in rows)} of {months} months")
+    return " | ".join(parts)
+
+
+def bar_figure(df, year, city_order):
+    # city_order pins each city to its facet row, so traces built later for
+    # the same cities land on the same axes. Traces come out city by city,
+    # disasters in option order within each.
+    return px.bar(
+        df,
+        x="Month",
+        y="Scale",
+        color="Disaster",
+        facet_row="City",
+        barmode="group",
+        title=f"Weather Forecast for {year}",
+        color_discrete_map=disaster_colors(),
+        category_orders={"Severity": severity_order, "City": city_order,
+                         "Disaster": get_weather_options()["disasters"]}
     )
-    def update_bar_chart(cities, year, disasters):
 
-        if not cities or not year or not disasters:
-            return px.bar(title="No data selected"), ""
 
-        df_filtered = df_weather[
-            (df_weather["City"].isin(cities)) &
-            (df_weather["Month"].str.startswith(str(year))) &
-            (df_weather["Disaster"].isin(disasters))
-        ]
+def create_bar_figure(cities, year, disasters):
+    if not cities or not year or not disasters:
+        return px.bar(title="No data selected"), ""
 
-        if df_filtered.empty:
-            return px.bar(title="No data available for selection"), ""
+    df_filtered = get_weather_index().select(City=cities, Year=year, Disaster=disasters)
 
-        fig = px.bar(
-            df_filtered,
-            x="Month",
-            y="Scale",
-            color="Disaster",
-            facet_row="City",
-            barmode="group",
-            title=f"Weather Forecast for {year}",
-            category_orders={"Severity": severity_order}
-        )
+    if df_filtered.empty:
+        return px.bar(title="No data available for selection"), ""
 
-        max_row = df_filtered.loc[df_filtered["Value"].idxmax()]
-        min_row = df_filtered.loc[df_filtered["Value"].idxmin()]
+    fig = bar_figure(df_filtered, year, list(df_filtered["City"].unique()))
+    return fig, bar_writeup(get_weather_stats().rows(cities, year, disasters))
 
-        writeup = (
-            f"Highest: {max_row['Disaster']} in {max_row['City']} "
-            f"({max_row['Value']} {max_row['Unit']}) | "
-            f"Lowest: {min_row['Disaster']} in {min_row['City']} "
-            f"({min_row['Value']} {min_row['Unit']})"
-        )
 
-        return fig, writeup
+@figure_cache.memoize("bar")
+@compact_outputs
+def build_bar_chart(cities, year, disasters):
+    fig, writeup = create_bar_figure(cities, year, disasters)
+    # Facet rows from the top down, i.e. the city order px was given
+    labels = sorted((a for a in fig.layout.annotations if a.text.startswith("City=")), key=lambda a: -a.y)
+    traces = [[trace.legendgroup, trace.yaxis] for trace in fig.data]
+    state = {"traces": traces,
+             "axes": list(dict.fromkeys(axis for _, axis in traces)),
+             "city_order": [a.text.split("=", 1)[1] for a in labels]}
+    return fig, writeup, state
 
 
-    # ---- DOWNLOAD PDF (FIXED) ----
-    @app.callback(
-        Output("download-pdf-bar", "data"),
-        Input("btn-pdf-bar", "n_clicks"),
-        State("bar-chart", "figure"),
-        prevent_initial_call=True
-    )
-    def download_pdf_bar(n, fig):
-        if not n or fig is None:
-            return no_update
-        pdf_bytes = pio.to_image(fig, format="pdf", width=900, height=700)
-        return dcc.send_bytes(pdf_bytes, "bar_chart.pdf")
+def patch_bar_chart(last, cities, year, disasters):
+    # Only the disaster selection changed: delete and insert traces instead
+    # of resending the whole faceted figure. None means rebuild.
+    rows = get_weather_stats().rows(cities, year, disasters)
+    if not rows:
+        return None
+
+    patch = Patch()
+    traces = list(last["traces"])
+    for i in reversed(range(len(traces))):
+        if traces[i][0] not in disasters:
+            del patch["data"][i]
+            del traces[i]
+
+    added = [d for d in disasters if d not in last["disasters"]]
+    if added:
+        df_added = get_weather_index().select(City=cities, Year=year, Disaster=added)
+        if set(df_added["City"].unique()) != set(last["city_order"]):
+            return None
+        # Insert each trace where a full build would put it (facet, then
+        # disaster option order), so bar groups and legend match a rebuild
+        order = get_weather_options()["disasters"]
 
+        def position(key):
+            return last["axes"].index(key[1]), order.index(key[0])
+
+        for trace in compact_figure(bar_figure(df_added, year, last["city_order"]))["data"]:
+            key = [trace["legendgroup"], trace["yaxis"]]
+            i = sum(position(t) < position(key) for t in traces)
+            patch["data"].insert(i, trace)
+            traces.insert(i, key)
+
+    state = {**last, "disasters": disasters, "traces": traces}
+    return patch, bar_writeup(rows), state
+
+
+def register_bar_callbacks(app):
 
-    # ---- DOWNLOAD PNG (FIXED) ----
     @app.callback(
-        Output("download-png-bar", "data"),
-        Input("btn-png-bar", "n_clicks"),
-        State("bar-chart", "figure"),
-        prevent_initial_call=True
+        Output("bar-chart", "figure"),
+        Output("bar-chart-writeup", "children"),
+        Output("bar-last", "data"),
+        Input("city-dropdown", "value"),
+        Input("year-dropdown", "value"),
+        Input("disaster-checkbox", "value"),
+        State("bar-last", "data")
     )
-    def download_png_bar(n, fig):
-        if not n or fig is None:
-            return no_update
-        img_bytes = pio.to_image(fig, format="png", width=900, height=700)
-        return dcc.send_bytes(img_bytes, "bar_chart.png")
+    @timed("bar")
+    def update_bar_chart(cities, year, disasters, last):
+        if (ctx.triggered_id == "disaster-checkbox" and last and last.get("traces")
+                and disasters and last["cities"] == cities and last["year"] == year):
+            patched = patch_bar_chart(last, cities, year, disasters)
+            if patched is not None:
+                return patched
+
+        fig, writeup, state = build_bar_chart(cities, year, disasters)
+        return fig, writeup, {**state, "cities": cities, "year": year, "disasters": disasters}
+
+
+    # ---- DOWNLOAD PDF / PNG (rendered off the request thread) ----
+    register_export_callbacks(app, "bar", "bar-chart", [
+        ("btn-pdf-bar", "download-pdf-bar", "pdf", "bar_chart.pdf"),
+        ("btn-png-bar", "download-png-bar", "png", "bar_chart.png"),
+    ])
+
+    @on_reload
+    def invalidate(changes):
+        pairs = changes.get("weather", set())
+        figure_cache.invalidate("bar", lambda cities, year, disasters: affects(pairs, cities, year))
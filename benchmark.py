@@ -0,0 +1,315 @@
+# benchmark.py
+# Calls the registered Dash callbacks and the data loaders directly, against
+# the bundled CSVs and synthetic datasets scaled up from them.
+#
+#   python benchmark.py                       # bundled data + 10x, 100x
+#   python benchmark.py --scales 1 10 100 1000
+#   python benchmark.py --save-baseline bench_baseline.json
+#   python benchmark.py --compare bench_baseline.json
+#
+# bench_baseline.json holds a reference run (x1 and x10); timings only
+# compare meaningfully on the same machine, so re-save it before comparing.
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from plotly.utils import PlotlyJSONEncoder
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
+
+os.environ.setdefault("ACCOUNTS_BACKEND", "memory")
+os.environ.setdefault("DATA_WATCH_INTERVAL", "0")
+
+import data_store
+import treemap_app
+from cache import figure_cache
+from app import app
+
+# ---------------------- CONFIG ----------------------
+BUNDLED_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SCALES = [1, 10, 100]
+ITERATIONS = 30
+SEED = 1234
+
+# ---------------------- SYNTHETIC DATA ----------------------
+def scale_split(factor):
+    # Spread the row multiplier over years (up to 10x) and cities
+    years = min(factor, 10)
+    return max(1, factor // years), years
+
+
+def make_scaled_dataset(factor, directory):
+    city_copies, year_copies = scale_split(factor)
+    files = [name for name in os.listdir(BUNDLED_DIR) if data_store.FORECAST_FILE_PATTERN.match(name)]
+    base = pd.concat([pd.read_csv(os.path.join(BUNDLED_DIR, name)) for name in sorted(files)],
+                     ignore_index=True)
+    coords = pd.read_csv(os.path.join(BUNDLED_DIR, data_store.COORDS_FILE))
+    first_year = int(base["Year"].min())
+    span = int(base["Year"].max()) - first_year + 1
+    rng = np.random.default_rng(SEED)
+
+    def city_name(city, copy):
+        return city if copy == 0 else f"{city} {copy}"
+
+    coords_out = pd.concat([
+        coords.assign(City=coords["City"].map(lambda c: city_name(c, copy)),
+                      lat=(coords["lat"] + rng.uniform(-2, 2, len(coords))).clip(-85, 85),
+                      lon=coords["lon"] + rng.uniform(-2, 2, len(coords)))
+        for copy in range(city_copies)
+    ], ignore_index=True)
+    coords_out.to_csv(os.path.join(directory, data_store.COORDS_FILE), index=False)
+
+    weather = os.path.join(directory, data_store.WEATHER_FILE)
+    columns = [c for c in base.columns if c != "Year"]
+    pd.DataFrame(columns=columns).to_csv(weather, index=False)
+    for block in range(year_copies):
+        for year in range(first_year, first_year + span):
+            rows = base[base["Year"] == year]
+            new_year = year + block * span
+            frames = []
+            for copy in range(city_copies):
+                frame = rows.copy()
+                frame["City"] = frame["City"].map(lambda c: city_name(c, copy))
+                frame["Month"] = frame["Month"].str.replace(str(year), str(new_year), regex=False)
+                frame["Year"] = new_year
+                frame["Value"] = frame["Value"] * rng.uniform(0.9, 1.1, len(frame))
+                frames.append(frame)
+            out = pd.concat(frames, ignore_index=True)
+            out.to_csv(os.path.join(directory, f"{new_year}.csv"), index=False)
+            out[columns].to_csv(weather, mode="a", header=False, index=False)
+
+
+def use_dataset(directory, cache_dir):
+    # Point data_store at another data directory and drop everything derived
+    data_store.DATA_DIR = directory
+    data_store.CACHE_DIR = cache_dir
+    with data_store._lock:
+        data_store._datasets = {}
+    figure_cache.clear()
+    treemap_app._figures.clear()
+
+# ---------------------- CASES ----------------------
+def callbacks():
+    fns = {}
+    for cb in app.callback_map.values():
+        if "callback" in cb:
+            func = getattr(cb["callback"], "__wrapped__", cb["callback"])
+            fns[func.__name__] = func
+    return fns
+
+
+def trigger(prop_id=None):
+    inputs = [{"prop_id": prop_id, "value": None}] if prop_id else []
+    context_value.set(AttributeDict(triggered_inputs=inputs))
+
+
+def make_cases(rng):
+    options = data_store.get_weather_options()
+    cities, years, disasters = options["cities"], options["years"], options["disasters"]
+    map_cities = sorted(data_store.get_city_coords()["City"])
+    fns = callbacks()
+
+    def pick(values, low=1, high=3):
+        return rng.sample(values, rng.randint(low, min(high, len(values))))
+
+    def navigation():
+        year = str(rng.choice(years))
+        month = f"{year}-{rng.randint(1, 12):02d}"
+        city = rng.choice(cities)
+        trigger("year-treemap.clickData")
+        fns["navigation"]({"points": [{"label": year}]}, None, None, None, None, None, None)
+        trigger("month-treemap.clickData")
+        fns["navigation"](None, {"points": [{"label": month}]}, None, None, year, None, None)
+        trigger("city-treemap.clickData")
+        return fns["navigation"](None, None, {"points": [{"label": city}]}, None, year, month, None)
+
+    def toggle(name, trigger_id, selections):
+        # A disaster checkbox click after a full render (the Patch path);
+        # the full renders happen here, outside the timed call
+        trigger("bench.value")
+        rendered = [(selection, fns[name](*selection, disasters, None)[-1]) for selection in selections]
+
+        def click():
+            selection, last = rng.choice(rendered)
+            toggled = rng.choice(disasters)
+            trigger(f"{trigger_id}.value")
+            return fns[name](*selection, [d for d in disasters if d != toggled], last)
+        return click
+
+    # name -> (mixed inputs, worst case): each returns the callback's output
+    return {
+        "update_bar_chart": (
+            lambda: fns["update_bar_chart"](pick(cities), rng.choice(years), pick(disasters, 1, len(disasters)), None),
+            lambda: fns["update_bar_chart"](cities, years[-1], disasters, None),
+        ),
+        "update_bar_chart (toggle)": (
+            toggle("update_bar_chart", "disaster-checkbox", [(pick(cities), rng.choice(years)) for _ in range(5)]),
+            None,
+        ),
+        "update_pie_chart": (
+            lambda: fns["update_pie_chart"](rng.choice(cities), rng.choice(years), pick(disasters, 1, len(disasters)), None),
+            lambda: fns["update_pie_chart"](cities[0], years[-1], disasters, None),
+        ),
+        "update_pie_chart (toggle)": (
+            toggle("update_pie_chart", "disaster-checkbox-pie", [(rng.choice(cities), rng.choice(years)) for _ in range(5)]),
+            None,
+        ),
+        "update_surface_plot": (
+            lambda: fns["update_surface_plot"](pick(cities), rng.choice(disasters), "auto", 0),
+            lambda: fns["update_surface_plot"](cities, disasters[0], "auto", 0),
+        ),
+        "update_surface_plot (surface)": (
+            lambda: fns["update_surface_plot"](pick(cities), rng.choice(disasters), "surface", 0),
+            lambda: fns["update_surface_plot"](cities, disasters[0], "surface", 0),
+        ),
+        "update_subplot_3d": (
+            lambda: fns["update_subplot_3d"](rng.choice(cities)),
+            None,
+        ),
+        "update_map": (
+            lambda: fns["update_map"](rng.choice(years), rng.choice(map_cities), rng.randint(1, 12), None),
+            lambda: fns["update_map"](years[-1], "All", 1, None),
+        ),
+        "navigation": (navigation, None),
+    }
+
+# ---------------------- MEASUREMENT ----------------------
+def payload_size(result):
+    return len(json.dumps(result, cls=PlotlyJSONEncoder))
+
+
+def measure(func, iterations, prepare=None):
+    timings, sizes = [], []
+    for _ in range(iterations):
+        if prepare:
+            prepare()
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+        sizes.append(payload_size(result) if result is not None else 0)
+
+    # Peak memory from a separate call: tracemalloc slows the timed ones
+    if prepare:
+        prepare()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    ms = np.array(timings) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "peak_kb": round(peak / 1024, 1),
+        "payload_kb": round(float(np.mean(sizes)) / 1024, 1),
+    }
+
+
+def cold_figures():
+    # Time the figure builds, not the figure cache
+    figure_cache.clear()
+    treemap_app._figures.clear()
+
+
+def bench_loading(iterations):
+    results = {}
+
+    def load(loader, use_cache=True):
+        def run():
+            previous, data_store.USE_CACHE = data_store.USE_CACHE, use_cache
+            try:
+                loader()
+            finally:
+                data_store.USE_CACHE = previous
+        return run
+
+    def drop_cache():
+        shutil.rmtree(data_store.CACHE_DIR, ignore_errors=True)
+
+    results["load_disaster_data (parse)"] = measure(load(data_store.load_disaster_data, False), iterations)
+    results["load_disaster_data (build cache)"] = measure(load(data_store.load_disaster_data), 1, drop_cache)
+    results["load_disaster_data (mmap)"] = measure(load(data_store.load_disaster_data), iterations)
+    results["load_weather_data (mmap)"] = measure(load(data_store.load_weather_data), iterations)
+    start = time.perf_counter()
+    data_store.preload()
+    results["preload"] = {"p50_ms": round((time.perf_counter() - start) * 1000, 3)}
+    return results
+
+
+def measure_case(func, iterations):
+    # A case that breaks at some scale is a result too
+    trigger("bench.value")
+    try:
+        return measure(func, iterations, cold_figures)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {str(e).splitlines()[0]}"}
+
+
+def bench_dataset(iterations):
+    results = bench_loading(max(3, iterations // 5))
+    rng = random.Random(SEED)
+    trigger("bench.value")
+    for name, (mixed, worst) in make_cases(rng).items():
+        results[name] = measure_case(mixed, iterations)
+        if worst:
+            results[f"{name} (worst)"] = measure_case(worst, max(3, iterations // 5))
+    return results
+
+# ---------------------- REPORT ----------------------
+def print_results(label, rows, rows_count, baseline=None):
+    print(f"\n== {label}: {rows_count} rows ==")
+    print(f"{'case':40} {'p50 ms':>10} {'p99 ms':>10} {'peak KB':>10} {'payload KB':>11}  vs baseline")
+    for case, r in rows.items():
+        previous = (baseline or {}).get(case)
+        delta = ""
+        if previous and previous.get("p50_ms") and r.get("p50_ms"):
+            delta = f"{r['p50_ms'] / previous['p50_ms']:.2f}x p50"
+        if "error" in r:
+            print(f"{case:40} {r['error'][:90]}")
+            continue
+        print(f"{case:40} {r.get('p50_ms', ''):>10} {r.get('p99_ms', ''):>10} "
+              f"{r.get('peak_kb', ''):>10} {r.get('payload_kb', ''):>11}  {delta}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark chart callbacks and data loading")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="row multipliers; 1 is the bundled data")
+    parser.add_argument("--iterations", type=int, default=ITERATIONS)
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="weather-bench-") as scratch:
+        for factor in args.scales:
+            label = f"x{factor}"
+            directory = BUNDLED_DIR
+            if factor != 1:
+                directory = os.path.join(scratch, label)
+                os.makedirs(directory)
+                make_scaled_dataset(factor, directory)
+            use_dataset(directory, os.path.join(scratch, f"{label}-cache"))
+            results[label] = bench_dataset(args.iterations)
+            print_results(label, results[label], len(data_store.get_disasters()), baseline.get(label))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "pandas": pd.__version__,
+                       "iterations": args.iterations, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# cache.py
+import os
+import ast
+import json
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+from plotly.utils import PlotlyJSONEncoder
+import data_store
+
+# ---------------------- CONFIG ----------------------
+FIGURE_CACHE_SIZE = int(os.environ.get("FIGURE_CACHE_SIZE", 256))
+# Set to a directory to share cached figures between gunicorn workers
+FIGURE_CACHE_DIR = os.environ.get("FIGURE_CACHE_DIR")
+
+
+def dumps(value):
+    return json.dumps(value, cls=PlotlyJSONEncoder)
+
+
+def normalize(value):
+    # Multi-select order doesn't change the figure (rows come back in frame
+    # order), so ["Flood", "Drought"] and ["Drought", "Flood"] share an entry.
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted((normalize(v) for v in value), key=repr))
+    if isinstance(value, dict):
+        return tuple(sorted(((k, normalize(v)) for k, v in value.items()), key=repr))
+    return value
+
+
+def make_key(name, args, stamp=None):
+    # stamp: the data the value was built from, so a worker still on older
+    # data never serves (or shares) a figure for newer data, or vice versa
+    return repr((name, tuple(normalize(a) for a in args), stamp))
+
+# ---------------------- BACKENDS ----------------------
+class LRUCache:
+    # Per-process cache of serialized JSON values with LRU eviction.
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, predicate):
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def invalidate(self, name, predicate):
+        # Drop entries of one memoized function whose arguments match
+        def matches(key):
+            try:
+                key_name, args, _ = ast.literal_eval(key)
+            except (ValueError, SyntaxError):
+                return True
+            return key_name == name and predicate(*args)
+        self.delete(matches)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {"backend": "memory", "size": len(self), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses}
+
+    def memoize(self, name):
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args):
+                stamp = data_store.data_stamp()
+                key = make_key(name, args, stamp)
+                cached = self.get(key)
+                if cached is not None:
+                    return json.loads(cached)
+                result = func(*args)
+                # Not if the data was (re)loaded meanwhile: the result may
+                # not match the stamp in the key
+                if data_store.data_stamp() == stamp:
+                    self.set(key, dumps(result))
+                return result
+            return wrapper
+        return decorator
+
+
+class FileCache(LRUCache):
+    # Shared across worker processes through a directory: one JSON file per
+    # entry, written atomically, with file mtime as the LRU clock.
+    # Hit/miss counters are per process.
+
+    def __init__(self, directory, maxsize=FIGURE_CACHE_SIZE):
+        super().__init__(maxsize)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    # File layout: the cache key on the first line (repr() never contains a
+    # newline), the serialized value after it.
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                f.readline()
+                value = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(key + "\n")
+            f.write(value)
+        os.replace(tmp, path)
+        self._evict()
+
+    def _entries_by_age(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    pass
+        return sorted(entries)
+
+    def _evict(self):
+        entries = self._entries_by_age()
+        for _, path in entries[:max(0, len(entries) - self.maxsize)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def delete(self, predicate):
+        for _, path in self._entries_by_age():
+            try:
+                with open(path, encoding="utf-8") as f:
+                    key = f.readline().rstrip("\n")
+                if predicate(key):
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        for _, path in self._entries_by_age():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def __len__(self):
+        return len(self._entries_by_age())
+
+    def stats(self):
+        stats = super().stats()
+        stats["backend"] = "file"
+        return stats
+
+
+def make_cache(directory=FIGURE_CACHE_DIR, maxsize=FIGURE_CACHE_SIZE):
+    if directory:
+        return FileCache(directory, maxsize)
+    return LRUCache(maxsize)
+
+
+figure_cache = make_cache()
@@ -0,0 +1,151 @@
+# compact.py
+import os
+import gzip
+import base64
+import functools
+import numpy as np
+import plotly.graph_objects as go
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ---------------------- CONFIG ----------------------
+# Turn off when a reverse proxy already compresses responses
+COMPRESS_RESPONSES = os.environ.get("COMPRESS_RESPONSES", "1") == "1"
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_TYPES = {"application/json", "text/html", "text/css", "text/plain",
+                  "text/javascript", "application/javascript"}
+# Dash's JS bundles are versioned by path and never change, so each is
+# compressed once per process (plotly.min.js alone is ~5 MB)
+STATIC_PREFIX = "/_dash-component-suites/"
+# Numeric arrays go to the browser as base64 float32: 7 significant digits
+# is more than any chart here shows.
+FLOAT_DTYPE = "<f4"
+MIN_ARRAY_LENGTH = 4
+
+# ---------------------- FIGURES ----------------------
+def encode_array(values):
+    array = np.asarray(values, dtype=FLOAT_DTYPE)
+    spec = {"dtype": "f4", "bdata": base64.b64encode(array.tobytes()).decode("ascii")}
+    if array.ndim > 1:
+        spec["shape"] = ", ".join(str(n) for n in array.shape)
+    return spec
+
+
+def _numeric(value):
+    # Float data as plotly.py leaves it: an ndarray, an f8 bdata spec (with a
+    # shape for 2-D data) or a plain list of numbers (possibly nested)
+    if isinstance(value, np.ndarray):
+        return value.dtype.kind == "f"
+    if isinstance(value, dict):
+        return value.get("dtype") == "f8" and "bdata" in value
+    if isinstance(value, list) and len(value) >= MIN_ARRAY_LENGTH:
+        rows = value if isinstance(value[0], list) else [value]
+        return all(isinstance(v, float) for row in rows for v in row) and len({len(r) for r in rows}) == 1
+    return False
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        array = np.frombuffer(base64.b64decode(value["bdata"]), dtype="<f8")
+        # 2-D arrays (a surface's z) carry their shape as "rows, cols"
+        if "shape" in value:
+            array = array.reshape([int(n) for n in str(value["shape"]).split(",")])
+        return array
+    return value
+
+
+def _compact(value):
+    if isinstance(value, dict):
+        compacted = {}
+        for key, item in value.items():
+            item = encode_array(_decode(item)) if _numeric(item) else _compact(item)
+            # Empty objects (e.g. "font": {} on facet labels) are plotly.js defaults
+            if isinstance(item, dict) and (not item or (key == "pattern" and item == {"shape": ""})):
+                continue
+            compacted[key] = item
+        return compacted
+    if isinstance(value, list):
+        return [_compact(item) for item in value]
+    return value
+
+
+def compact_figure(fig):
+    fig = fig.to_plotly_json() if isinstance(fig, go.Figure) else fig
+    data = [_compact(trace) for trace in fig.get("data", [])]
+    layout = dict(fig.get("layout", {}))
+
+    # The default template carries trace defaults for ~40 trace types; keep
+    # only the ones this figure draws, so it renders exactly the same.
+    template = layout.get("template")
+    if isinstance(template, go.layout.Template):
+        template = template.to_plotly_json()
+    if template:
+        types = {trace.get("type", "scatter") for trace in data}
+        layout["template"] = {
+            "data": {t: v for t, v in template.get("data", {}).items() if t in types},
+            "layout": template.get("layout", {}),
+        }
+    compacted = {"data": data, "layout": _compact(layout)}
+    if fig.get("frames"):
+        compacted["frames"] = [_compact(frame) for frame in fig["frames"]]
+    return compacted
+
+
+def is_figure(value):
+    return isinstance(value, go.Figure) or (isinstance(value, dict) and "data" in value and "layout" in value)
+
+
+def compact_outputs(func):
+    # Compacts every figure among a callback's outputs
+    @functools.wraps(func)
+    def wrapper(*args):
+        result = func(*args)
+        if isinstance(result, tuple):
+            return tuple(compact_figure(r) if is_figure(r) else r for r in result)
+        return compact_figure(result) if is_figure(result) else result
+    return wrapper
+
+# ---------------------- HTTP COMPRESSION ----------------------
+_static = {}
+
+
+def _encoding():
+    accepted = request.headers.get("Accept-Encoding", "")
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def register_compression(app):
+
+    @app.server.after_request
+    def compress(response):
+        # Streamed bodies (data exports) would have to be buffered whole
+        if (not COMPRESS_RESPONSES or response.direct_passthrough or response.is_streamed
+                or response.status_code != 200
+                or "Content-Encoding" in response.headers or response.mimetype not in COMPRESS_TYPES):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = _encoding()
+        body = response.get_data()
+        if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+            return response
+        static = request.path.startswith(STATIC_PREFIX)
+        key = (request.full_path, encoding)
+        if static and key in _static:
+            body = _static[key]
+        elif encoding == "br":
+            body = brotli.compress(body, quality=5)
+        else:
+            body = gzip.compress(body, compresslevel=5)
+        if static:
+            _static[key] = body
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,159 @@
+# data_export.py
+# The rows behind the charts as downloads, filtered the same way the chart
+# callbacks filter them (through the data_store slice indexes):
+#
+#   /export/weather.csv?cities=Chicago,London&years=2027&disasters=Flood
+#   /export/forecasts.csv?years=2026,2027&months=1,2,3&severities=High
+#   /export/forecasts.parquet                    (needs pyarrow)
+#
+# Responses are streamed a chunk of rows at a time, so a full multi-year
+# export never sits in one response buffer.
+import os
+import numpy as np
+from flask import Response, request, abort
+from data_store import get_weather_index, get_disaster_index
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# ---------------------- CONFIG ----------------------
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", 50_000))
+
+# dataset -> (index getter, columns as in the source CSVs)
+DATASETS = {
+    "weather": (get_weather_index, ["City", "Month", "Disaster", "Value", "Unit", "Threshold",
+                                    "Above/Below", "Severity", "Scale"]),
+    "forecasts": (get_disaster_index, ["City", "Month", "Disaster", "Value", "Unit", "Threshold",
+                                       "Above/Below", "Severity", "Scale", "Year"]),
+}
+FILTER_COLUMNS = {"cities": "City", "years": "Year", "months": "Month_num",
+                  "disasters": "Disaster", "severities": "Severity"}
+
+# ---------------------- ROWS ----------------------
+def split_filters(index, filters):
+    # Filters on a prefix of the index levels pick row blocks through the
+    # index; the rest (e.g. Disaster on the forecasts index) have to be
+    # checked row by row.
+    prefix = {}
+    for level in index.levels:
+        if filters.get(level) is None:
+            break
+        prefix[level] = filters[level]
+    rest = {column: values for column, values in filters.items() if column not in prefix}
+    return index.positions(**prefix), rest
+
+
+def export_chunks(index, filters, columns, chunk_rows=EXPORT_CHUNK_ROWS):
+    # The row-by-row filters run chunk by chunk, never over the whole frame.
+    # Holding `index` pins one data version for the whole download.
+    positions, rest = split_filters(index, filters)
+    for start in range(0, len(positions), chunk_rows):
+        chunk = index.frame.take(positions[start:start + chunk_rows])
+        for column, values in rest.items():
+            chunk = chunk[np.isin(chunk[column].to_numpy(), values)]
+        if len(chunk):
+            yield chunk[columns]
+
+
+def csv_stream(chunks, columns):
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header)
+        header = False
+    if header:
+        yield ",".join(columns) + "\n"
+
+
+class _Sink:
+    # Write-only file object for the Parquet writer; drained after each row group
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def parquet_stream(chunks, empty):
+    # One row group per chunk
+    sink = _Sink()
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table)
+        yield sink.drain()
+    if writer is None:
+        table = pa.Table.from_pandas(empty, preserve_index=False)
+        writer = pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table)
+    writer.close()
+    yield sink.drain()
+
+# ---------------------- ROUTE ----------------------
+def list_arg(name):
+    # ?cities=A,B and ?cities=A&cities=B both give ["A", "B"]
+    return [v for raw in request.args.getlist(name) for v in raw.split(",") if v]
+
+
+def parse_filters(frame):
+    filters = {}
+    for arg, column in FILTER_COLUMNS.items():
+        values = list_arg(arg)
+        if not values:
+            continue
+        if column in ("Year", "Month_num"):
+            try:
+                values = [int(v) for v in values]
+            except ValueError:
+                abort(400, f"{arg} must be integers")
+            known = set(frame[column].unique().tolist())
+        else:
+            known = set(frame[column].cat.categories)
+        unknown = [v for v in values if v not in known]
+        if unknown:
+            abort(400, f"Unknown {arg}: {unknown}")
+        filters[column] = values
+    return filters
+
+
+def register_data_export_routes(app):
+
+    @app.server.route("/export/<dataset>.<fmt>")
+    def export_data(dataset, fmt):
+        if dataset not in DATASETS or fmt not in ("csv", "parquet"):
+            abort(404)
+        if fmt == "parquet" and pq is None:
+            abort(501, "Parquet export needs pyarrow")
+
+        get_index, columns = DATASETS[dataset]
+        index = get_index()
+        chunks = export_chunks(index, parse_filters(index.frame), columns)
+        if fmt == "csv":
+            body, mimetype = csv_stream(chunks, columns), "text/csv"
+        else:
+            body, mimetype = parquet_stream(chunks, index.frame[columns].iloc[:0]), "application/vnd.apache.parquet"
+        return Response(body, mimetype=mimetype,
+                        headers={"Content-Disposition": f"attachment; filename={dataset}.{fmt}"})
@@ -0,0 +1,669 @@
+# data_store.py
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+
+# ---------------------- CONFIG ----------------------
+DATA_DIR = os.environ.get("WEATHER_DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
+
+WEATHER_FILE = "predicted_crime_corrected.csv"
+COORDS_FILE = "city_coords.csv"
+# Forecast years are discovered from YYYY.csv files in DATA_DIR
+FORECAST_FILE_PATTERN = re.compile(r"^(\d{4})\.csv$")
+
+# Binary column cache: parsed CSVs are stored as .npy files and memory-mapped,
+# so worker processes share one copy through the OS page cache.
+CACHE_DIR = os.environ.get("WEATHER_CACHE_DIR", os.path.join(DATA_DIR, ".data_cache"))
+USE_CACHE = os.environ.get("WEATHER_CACHE", "1") == "1"
+
+CATEGORY_COLUMNS = ["City", "Disaster", "Severity", "Unit", "Above/Below"]
+
+severity_order = ["Low", "Medium", "High", "Very High"]
+
+# ---------------------- LOADERS ----------------------
+def data_path(name):
+    return os.path.join(DATA_DIR, name)
+
+
+def categorize(df, columns=CATEGORY_COLUMNS):
+    for col in columns:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def parse_months(df):
+    # "2026-01" -> Year=2026, Month_num=1 without a per-row Python split
+    months = pd.to_datetime(df["Month"], format="%Y-%m")
+    df["Year"] = months.dt.year.astype("int16")
+    df["Month_num"] = months.dt.month.astype("int8")
+    return df
+
+
+def read_weather_csv():
+    df = pd.read_csv(data_path(WEATHER_FILE))
+    return categorize(parse_months(df))
+
+
+def forecast_files():
+    return sorted(name for name in os.listdir(DATA_DIR) if FORECAST_FILE_PATTERN.match(name))
+
+
+def file_year(name):
+    return int(FORECAST_FILE_PATTERN.match(name).group(1))
+
+
+def read_disaster_csvs(files):
+    all_dfs = [pd.read_csv(data_path(name)) for name in files]
+    if not all_dfs:
+        return pd.DataFrame()
+    # Categorize after the concat so every year shares one set of categories
+    df = pd.concat(all_dfs, ignore_index=True)
+    return categorize(parse_months(df))
+
+
+def load_weather_data():
+    return load_cached("weather", [WEATHER_FILE], read_weather_csv)
+
+
+def load_disaster_data():
+    files = forecast_files()
+    return load_cached("disasters", files, lambda: read_disaster_csvs(files))
+
+
+def load_city_coords():
+    return pd.read_csv(data_path(COORDS_FILE), dtype={"City": "category"})
+
+# ---------------------- COLUMN CACHE ----------------------
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_stats(sources):
+    stats = {}
+    for name in sources:
+        st = os.stat(data_path(name))
+        stats[name] = {"mtime": st.st_mtime_ns, "size": st.st_size}
+    return stats
+
+
+def _write_json(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_manifest(name):
+    try:
+        with open(os.path.join(CACHE_DIR, f"{name}.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _save_columns(df, directory):
+    columns = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        path = os.path.join(directory, f"col{i}.npy")
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            np.save(path, series.array.codes)
+            columns.append({"name": col, "kind": "category", "categories": series.cat.categories.tolist()})
+        elif pd.api.types.is_numeric_dtype(series):
+            np.save(path, series.to_numpy())
+            columns.append({"name": col, "kind": "numeric"})
+        else:
+            # Plain strings are dictionary-encoded on disk and decoded on load
+            codes, uniques = pd.factorize(series)
+            np.save(path, codes.astype(np.int32))
+            columns.append({"name": col, "kind": "string", "categories": uniques.tolist()})
+    return columns
+
+
+def _load_columns(manifest):
+    directory = os.path.join(CACHE_DIR, manifest["version"])
+    data = {}
+    for i, column in enumerate(manifest["columns"]):
+        values = np.load(os.path.join(directory, f"col{i}.npy"), mmap_mode="r")
+        if column["kind"] == "numeric":
+            data[column["name"]] = values
+        else:
+            values = pd.Categorical.from_codes(values, categories=column["categories"])
+            data[column["name"]] = values if column["kind"] == "category" else pd.Series(values).astype("str")
+    return pd.DataFrame(data, copy=False)
+
+
+def _build_cache(name, df, sources):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    combined = hashlib.sha1(json.dumps(sources, sort_keys=True).encode("utf-8")).hexdigest()
+    version = f"{name}-{combined[:12]}"
+    target = os.path.join(CACHE_DIR, version)
+
+    if not os.path.isdir(target):
+        tmp = tempfile.mkdtemp(dir=CACHE_DIR, prefix=f".{name}-")
+        columns = _save_columns(df, tmp)
+        _write_json(os.path.join(tmp, "columns.json"), columns)
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            # Another worker finished the same version first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    with open(os.path.join(target, "columns.json"), encoding="utf-8") as f:
+        columns = json.load(f)
+    manifest = {"version": version, "sources": sources, "columns": columns}
+    _write_json(os.path.join(CACHE_DIR, f"{name}.json"), manifest)
+
+    # Drop superseded versions; processes still mapping them keep their pages
+    for entry in os.listdir(CACHE_DIR):
+        if entry.startswith(f"{name}-") and entry != version:
+            shutil.rmtree(os.path.join(CACHE_DIR, entry), ignore_errors=True)
+    return manifest
+
+
+def load_cached(name, sources, reader):
+    if not USE_CACHE or not sources:
+        return reader()
+
+    stats = _source_stats(sources)
+    manifest = _read_manifest(name)
+    if manifest and set(manifest["sources"]) == set(stats):
+        cached = manifest["sources"]
+        if all(cached[n]["mtime"] == stats[n]["mtime"] and cached[n]["size"] == stats[n]["size"] for n in stats):
+            return _load_columns(manifest)
+        # Touched but unchanged files only need their mtimes refreshed
+        for n in stats:
+            stats[n]["sha1"] = _file_hash(data_path(n))
+        if all(cached[n]["sha1"] == stats[n]["sha1"] for n in stats):
+            manifest["sources"] = stats
+            _write_json(os.path.join(CACHE_DIR, f"{name}.json"), manifest)
+            return _load_columns(manifest)
+    else:
+        for n in stats:
+            stats[n]["sha1"] = _file_hash(data_path(n))
+
+    df = reader()
+    try:
+        return _load_columns(_build_cache(name, df, stats))
+    except OSError:
+        # Read-only data directory: serve the parsed frame
+        return df
+
+# ---------------------- SLICE INDEX ----------------------
+def _as_list(value):
+    if isinstance(value, (list, tuple, set, np.ndarray, pd.Index)):
+        return list(value)
+    return [value]
+
+
+class SliceIndex:
+    # Rows grouped by a stable lexsort on `levels`, so every key prefix
+    # (e.g. (City,), (City, Year)) maps to one contiguous block of row
+    # positions. Lookups are dict hits; results keep the frame's row order,
+    # identical to what a boolean mask over the whole frame would return.
+
+    def __init__(self, df, levels):
+        self.frame = df
+        self.levels = list(levels)
+        self._casts = {
+            level: int for level in self.levels
+            if pd.api.types.is_integer_dtype(df[level])
+        }
+        codes = [
+            df[level].cat.codes.to_numpy() if isinstance(df[level].dtype, pd.CategoricalDtype)
+            else df[level].to_numpy()
+            for level in self.levels
+        ]
+        self._order = np.lexsort(codes[::-1])
+        self._blocks = []
+
+        n = len(df)
+        boundary = np.zeros(n, dtype=bool)
+        if n:
+            boundary[0] = True
+        for depth, level_codes in enumerate(codes, start=1):
+            sorted_codes = level_codes[self._order]
+            boundary[1:] |= sorted_codes[1:] != sorted_codes[:-1]
+            starts = np.flatnonzero(boundary)
+            stops = np.append(starts[1:], n)
+            keys = zip(*(
+                df[level].to_numpy()[self._order[starts]].tolist()
+                for level in self.levels[:depth]
+            ))
+            self._blocks.append({
+                key: (start, stop)
+                for key, start, stop in zip(keys, starts.tolist(), stops.tolist())
+            })
+
+    def _normalize(self, level, wanted):
+        cast = self._casts.get(level)
+        values = _as_list(wanted)
+        return [cast(v) for v in values] if cast else values
+
+    def keys(self, depth=1):
+        return list(self._blocks[depth - 1])
+
+    def positions(self, **filters):
+        prefix = [()]
+        depth = 0
+        for level in self.levels:
+            if filters.get(level) is None:
+                break
+            prefix = [key + (v,) for key in prefix for v in self._normalize(level, filters[level])]
+            depth += 1
+
+        if depth == 0:
+            positions = np.arange(len(self.frame))
+        else:
+            blocks = self._blocks[depth - 1]
+            spans = [blocks[key] for key in prefix if key in blocks]
+            if not spans:
+                return np.empty(0, dtype=np.intp)
+            positions = np.sort(np.concatenate([self._order[a:b] for a, b in spans]))
+
+        # Levels past the first unfiltered one are applied to the (small) block
+        for level in self.levels[depth:]:
+            if filters.get(level) is None:
+                continue
+            column = self.frame[level].to_numpy()[positions]
+            positions = positions[np.isin(column, self._normalize(level, filters[level]))]
+        return positions
+
+    def select(self, **filters):
+        return self.frame.take(self.positions(**filters))
+
+# ---------------------- HIERARCHY ----------------------
+HIERARCHY_COLUMNS = ["Disaster", "Value", "Unit", "Severity", "Scale"]
+
+
+def build_hierarchy(df):
+    # {"2026": {"2026-01": {"London": [(Disaster, Value, Unit, Severity, Scale), ...]}}}
+    # in file order, built in one pass so drill-downs never touch the frame.
+    hierarchy = {}
+    columns = ["Year", "Month", "City"] + HIERARCHY_COLUMNS
+    for year, month, city, *record in df[columns].itertuples(index=False, name=None):
+        months = hierarchy.setdefault(str(year), {})
+        cities = months.setdefault(month, {})
+        cities.setdefault(city, []).append(tuple(record))
+    return hierarchy
+
+# ---------------------- MAP POINTS ----------------------
+def build_map_points(df, coords):
+    # One row per (Year, Month_num, City) with its coordinates and the hover
+    # text for every disaster at that point, built with column-wise string ops.
+    hover = (
+        "<b>Disaster:</b> " + df["Disaster"].astype(str) + "<br>"
+        + "<b>Severity:</b> " + df["Severity"].astype(str) + "<br>"
+        + "<b>Scale:</b> " + df["Scale"].round(2).astype(str) + "<br>"
+        + "<b>Value:</b> " + df["Value"].round(2).astype(str) + " " + df["Unit"].astype(str) + "<br>"
+        + "------------------------"
+    )
+    keys = ["Year", "Month_num", "City"]
+    points = (
+        df[keys].assign(hover=hover)
+        .groupby(keys, observed=True, sort=False)["hover"]
+        .agg("<br>".join)
+        .reset_index()
+    )
+    points["City"] = points["City"].astype(str)
+    coords = coords.assign(City=coords["City"].astype(str))
+    points = points.merge(coords, on="City", how="inner", sort=False)
+    return categorize(points, ["City"])
+
+# ---------------------- WEATHER STATS ----------------------
+STATS_LEVELS = ["City", "Year", "Disaster"]
+
+
+def build_weather_stats(df):
+    # One row per (City, Year, Disaster): the monthly forecasts summarised,
+    # so writeups merge a few rows instead of scanning the selection.
+    # *_row is the source row position, which keeps ties resolved the way
+    # idxmax/idxmin over the filtered frame would.
+    value = pd.Series(df["Value"].to_numpy(dtype="float64"))
+    month = pd.Series(df["Month_num"].to_numpy(dtype="float64"))
+    keys = [df[level].reset_index(drop=True) for level in STATS_LEVELS]
+    groups = value.groupby(keys, observed=True, sort=False)
+    max_row, min_row = groups.idxmax(), groups.idxmin()
+
+    # Least-squares slope of Value over the months, per group
+    sums = pd.DataFrame({"x": month, "y": value, "xy": month * value, "xx": month * month}).groupby(
+        keys, observed=True, sort=False).sum()
+    n = groups.size()
+    spread = n * sums["xx"] - sums["x"] ** 2
+    trend = (n * sums["xy"] - sums["x"] * sums["y"]) / spread.where(spread != 0)
+
+    stats = pd.DataFrame({
+        "Unit": df["Unit"].reset_index(drop=True).groupby(keys, observed=True, sort=False).first(),
+        "months": n.astype("int32"),
+        "mean": groups.mean(),
+        "trend": trend.fillna(0.0),
+        "above": (df["Above/Below"].reset_index(drop=True) == "Above").groupby(
+            keys, observed=True, sort=False).sum().astype("int32"),
+        "max": value.to_numpy()[max_row.to_numpy()],
+        "max_month": df["Month"].to_numpy()[max_row.to_numpy()],
+        "max_row": max_row.to_numpy(),
+        "min": value.to_numpy()[min_row.to_numpy()],
+        "min_month": df["Month"].to_numpy()[min_row.to_numpy()],
+        "min_row": min_row.to_numpy(),
+    })
+    return WeatherStats(stats.reset_index())
+
+
+class WeatherStats:
+    # The summary rows behind a SliceIndex. rows() hands back plain dicts:
+    # a writeup reads a handful of rows, and pandas row access would cost
+    # more than the scan it replaces.
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.index = SliceIndex(frame, STATS_LEVELS)
+        self.columns = {column: frame[column].to_numpy() for column in frame.columns}
+
+    def rows(self, cities, year, disasters):
+        positions = self.index.positions(City=cities, Year=year, Disaster=disasters)
+        values = [column[positions].tolist() for column in self.columns.values()]
+        return [dict(zip(self.columns, row)) for row in zip(*values)]
+
+# ---------------------- THRESHOLD CUBE ----------------------
+def count_above(df):
+    above = (df["Above/Below"] == "Above").astype("int32")
+    yearly = above.groupby([df["Year"], df["City"], df["Disaster"]], observed=True).sum()
+    monthly = above.groupby([df["Year"], df["City"], df["Month_num"]], observed=True).sum()
+    return yearly, monthly
+
+
+class ThresholdCube:
+    # Months above threshold per (City, Year, Disaster) and disasters above
+    # threshold per (City, Year, Month_num), counted from the forecasts.
+    # Counts are kept per year so a new year file is folded in with
+    # add_year() without recounting the rest.
+
+    def __init__(self):
+        self.yearly = {}
+        self.monthly = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        cube = cls()
+        cube._merge(*count_above(df))
+        return cube
+
+    def _merge(self, yearly, monthly):
+        for (year, city, disaster), count in yearly.items():
+            self.yearly.setdefault(int(year), {})[(city, disaster)] = int(count)
+        for (year, city, month), count in monthly.items():
+            self.monthly.setdefault(int(year), {})[(city, int(month))] = int(count)
+
+    def add_year(self, year, df):
+        self.remove_year(year)
+        self._merge(*count_above(df))
+
+    def remove_year(self, year):
+        self.yearly.pop(int(year), None)
+        self.monthly.pop(int(year), None)
+
+    def copy(self):
+        cube = ThresholdCube()
+        cube.yearly = dict(self.yearly)
+        cube.monthly = dict(self.monthly)
+        return cube
+
+    def years(self):
+        return sorted(self.yearly)
+
+    def cities(self):
+        return sorted({city for counts in self.yearly.values() for city, _ in counts})
+
+    def disasters(self):
+        return sorted({disaster for counts in self.yearly.values() for _, disaster in counts})
+
+    def count(self, city, year, disaster):
+        return self.yearly.get(int(year), {}).get((city, disaster), 0)
+
+    def counts(self, city, year, disasters):
+        return {disaster: self.count(city, year, disaster) for disaster in sorted(disasters)}
+
+    def month_counts(self, city, year):
+        counts = self.monthly.get(int(year), {})
+        return {month: counts.get((city, month), 0) for month in range(1, 13)}
+
+# ---------------------- SHARED ACCESS ----------------------
+# One copy of each dataset per process, loaded on first use. refresh() swaps
+# in a whole new dict, so readers always see one consistent data version.
+_datasets = {}
+_lock = threading.RLock()
+_listeners = []
+data_version = 0
+
+
+def _get(name, loader):
+    datasets = _datasets
+    if name not in datasets:
+        with _lock:
+            if name not in _datasets:
+                _datasets[name] = loader()
+            return _datasets[name]
+    return datasets[name]
+
+
+def data_stamp():
+    # Names the loaded data across processes, which data_version (a count of
+    # this process's reloads) can't: a hash of the source stats it came from
+    datasets = _datasets
+    sources = {name: stats for name, stats in datasets.items() if name.endswith("@sources")}
+    return hashlib.sha1(json.dumps(sources, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def _tracked(name, files, loader):
+    # Remember the source stats a dataset was loaded from, for refresh()
+    def load():
+        _datasets[f"{name}@sources"] = _source_stats(files())
+        return loader()
+    return load
+
+
+def build_weather_index(df):
+    return SliceIndex(df, ["City", "Year", "Disaster"])
+
+
+def build_disaster_index(df):
+    return SliceIndex(df, ["Year", "Month_num", "City"])
+
+
+def build_map_index(df):
+    return SliceIndex(build_map_points(df, get_city_coords()), ["Year", "Month_num", "City"])
+
+
+def get_weather():
+    return _get("weather", _tracked("weather", lambda: [WEATHER_FILE], load_weather_data))
+
+
+def get_disasters():
+    return _get("disasters", _tracked("disasters", forecast_files, load_disaster_data))
+
+
+def get_weather_index():
+    return _get("weather_index", lambda: build_weather_index(get_weather()))
+
+
+def get_disaster_index():
+    return _get("disaster_index", lambda: build_disaster_index(get_disasters()))
+
+
+def get_weather_stats():
+    return _get("weather_stats", lambda: build_weather_stats(get_weather()))
+
+
+def build_weather_options(df):
+    # Dropdown choices, computed once per data version instead of per render
+    return {
+        "cities": df["City"].unique().tolist(),
+        "years": sorted(int(y) for y in df["Year"].unique()),
+        "disasters": df["Disaster"].unique().tolist(),
+    }
+
+
+def get_weather_options():
+    return _get("weather_options", lambda: build_weather_options(get_weather()))
+
+
+def get_threshold_cube():
+    return _get("threshold_cube", lambda: ThresholdCube.from_frame(get_disasters()))
+
+
+def get_city_coords():
+    return _get("city_coords", load_city_coords)
+
+
+def get_map_index():
+    return _get("map_index", lambda: build_map_index(get_disasters()))
+
+
+def get_hierarchy():
+    return _get("hierarchy", lambda: build_hierarchy(get_disasters()))
+
+
+def preload():
+    get_weather_index()
+    get_weather_stats()
+    get_disaster_index()
+    get_threshold_cube()
+    get_map_index()
+    get_hierarchy()
+
+# ---------------------- HOT RELOAD ----------------------
+def on_reload(listener):
+    # listener(changes): changes maps "weather"/"disasters" to the set of
+    # (Year, City) pairs whose rows were added, removed or modified.
+    _listeners.append(listener)
+    return listener
+
+
+def affects(pairs, cities=None, years=None):
+    # Whether a selection (None = all) overlaps the changed (Year, City) pairs
+    cities = None if cities is None else set(_as_list(cities))
+    try:
+        years = None if years is None else {int(y) for y in _as_list(years)}
+    except (TypeError, ValueError):
+        return True
+    return any((years is None or year in years) and (cities is None or city in cities)
+               for year, city in pairs)
+
+
+def _group_hashes(df):
+    if df.empty:
+        return {}
+    hashes = pd.util.hash_pandas_object(df, index=False)
+    return hashes.groupby([df["Year"], df["City"]], observed=True).sum().to_dict()
+
+
+def changed_pairs(old, new):
+    old_hashes, new_hashes = _group_hashes(old), _group_hashes(new)
+    return {
+        (int(year), city) for year, city in old_hashes.keys() | new_hashes.keys()
+        if old_hashes.get((year, city)) != new_hashes.get((year, city))
+    }
+
+
+def _recategorize(frames):
+    # Align categories across frames loaded at different times before concat
+    frames = [f.astype({c: str for c in CATEGORY_COLUMNS if c in f.columns}) for f in frames]
+    return categorize(pd.concat(frames, ignore_index=True))
+
+
+def _reload_weather(datasets):
+    stats = _source_stats([WEATHER_FILE])
+    if datasets.get("weather@sources") == stats:
+        return set()
+    old = datasets["weather"]
+    new = load_weather_data()
+    datasets["weather"] = new
+    datasets["weather@sources"] = stats
+    if "weather_index" in datasets:
+        datasets["weather_index"] = build_weather_index(new)
+    if "weather_stats" in datasets:
+        datasets["weather_stats"] = build_weather_stats(new)
+    if "weather_options" in datasets:
+        datasets["weather_options"] = build_weather_options(new)
+    return changed_pairs(old, new)
+
+
+def _reload_disasters(datasets):
+    files = forecast_files()
+    stats = _source_stats(files)
+    loaded = datasets.get("disasters@sources", {})
+    touched = {name for name in loaded.keys() | stats.keys() if loaded.get(name) != stats.get(name)}
+    if not touched:
+        return set()
+
+    years = {file_year(name) for name in touched}
+    old = datasets["disasters"]
+    manifest = _read_manifest("disasters")
+    if USE_CACHE and manifest and {n: {k: v[k] for k in ("mtime", "size")} for n, v in manifest["sources"].items()} == stats:
+        # Another worker already ingested this version
+        new = _load_columns(manifest)
+    else:
+        # Parse only the new/changed files; keep every other year's rows
+        kept = old[~old["Year"].isin(years)]
+        fresh = read_disaster_csvs(sorted(n for n in touched if n in stats))
+        new = _recategorize([kept, fresh]).sort_values("Year", kind="stable", ignore_index=True)
+        if USE_CACHE:
+            for name in stats:
+                stats[name]["sha1"] = _file_hash(data_path(name))
+            try:
+                new = _load_columns(_build_cache("disasters", new, stats))
+            except OSError:
+                pass
+            stats = {n: {k: v[k] for k in ("mtime", "size")} for n, v in stats.items()}
+
+    datasets["disasters"] = new
+    datasets["disasters@sources"] = stats
+    changed_rows = new[new["Year"].isin(years)]
+
+    if "disaster_index" in datasets:
+        datasets["disaster_index"] = build_disaster_index(new)
+    if "map_index" in datasets:
+        datasets["map_index"] = build_map_index(new)
+    if "hierarchy" in datasets:
+        hierarchy = {y: months for y, months in datasets["hierarchy"].items() if int(y) not in years}
+        hierarchy.update(build_hierarchy(changed_rows))
+        datasets["hierarchy"] = dict(sorted(hierarchy.items()))
+    if "threshold_cube" in datasets:
+        cube = datasets["threshold_cube"].copy()
+        for year in years:
+            cube.add_year(year, changed_rows[changed_rows["Year"] == year])
+        datasets["threshold_cube"] = cube
+
+    return changed_pairs(old[old["Year"].isin(years)], changed_rows)
+
+
+def refresh():
+    global _datasets, data_version
+    with _lock:
+        datasets = dict(_datasets)
+        changes = {}
+        if "weather" in datasets:
+            changes["weather"] = _reload_weather(datasets)
+        if "disasters" in datasets:
+            changes["disasters"] = _reload_disasters(datasets)
+        # Swap even when only file stats moved, so the files aren't re-read
+        changes = {name: pairs for name, pairs in changes.items() if pairs}
+        _datasets = datasets
+        if not changes:
+            return changes
+        data_version += 1
+
+    for listener in _listeners:
+        listener(changes)
+    return changes
@@ -0,0 +1,36 @@
+# data_watcher.py
+import os
+import threading
+import time
+import logging
+from data_store import refresh
+
+# ---------------------- CONFIG ----------------------
+# Seconds between checks of DATA_DIR for new/changed CSVs; 0 turns it off
+DATA_WATCH_INTERVAL = float(os.environ.get("DATA_WATCH_INTERVAL", 30))
+
+log = logging.getLogger(__name__)
+_thread = None
+
+# ---------------------- WATCHER ----------------------
+def _watch(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            changes = refresh()
+        except Exception:
+            # A half-written file is picked up again on the next pass
+            log.exception("Data reload failed")
+            continue
+        if changes:
+            log.info("Reloaded data: %s", {name: len(pairs) for name, pairs in changes.items()})
+
+
+def start_data_watcher(interval=DATA_WATCH_INTERVAL):
+    # One polling thread per process; gunicorn workers each start their own
+    global _thread
+    if interval <= 0 or (_thread is not None and _thread.is_alive()):
+        return _thread
+    _thread = threading.Thread(target=_watch, args=(interval,), name="data-watcher", daemon=True)
+    _thread.start()
+    return _thread
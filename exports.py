@@ -0,0 +1,173 @@
+# exports.py
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dash import html, dcc, Input, Output, State, no_update, ctx
+import plotly.io as pio
+from cache import dumps
+from metrics import timed
+
+# ---------------------- CONFIG ----------------------
+EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", 2))
+# Renders and job status live on disk so any gunicorn worker can answer a
+# poll, and a figure rendered once is served from here afterwards.
+EXPORT_DIR = os.environ.get("EXPORT_DIR", os.path.join(tempfile.gettempdir(), "weather-exports"))
+EXPORT_POLL_MS = 500
+# Renders not asked for again within this many seconds are deleted
+EXPORT_TTL = int(os.environ.get("EXPORT_TTL", 3600))
+# A job still queued/rendering after this long is taken as lost (its worker
+# was recycled, or Chrome hung) and reported as failed, so it can be retried
+EXPORT_JOB_TIMEOUT = int(os.environ.get("EXPORT_JOB_TIMEOUT", 300))
+
+_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+_lock = threading.Lock()
+_last_sweep = 0.0
+
+# ---------------------- JOB QUEUE ----------------------
+def export_key(fig, fmt, width, height):
+    payload = f"{fmt}:{width}x{height}:{dumps(fig)}"
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _path(key, suffix):
+    return os.path.join(EXPORT_DIR, f"{key}.{suffix}")
+
+
+def _write_status(key, state, progress, error=None):
+    tmp = f"{_path(key, 'status')}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"state": state, "progress": progress, "error": error}, f)
+    os.replace(tmp, _path(key, "status"))
+
+
+def _render(key, fig, fmt, width, height):
+    try:
+        _write_status(key, "rendering", 50)
+        data = pio.to_image(fig, format=fmt, width=width, height=height)
+        tmp = f"{_path(key, 'bin')}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, _path(key, "bin"))
+        _write_status(key, "done", 100)
+    except Exception as e:
+        _write_status(key, "error", 100, str(e))
+
+
+def _sweep():
+    # At most every EXPORT_TTL / 10 seconds per process
+    global _last_sweep
+    now = time.time()
+    if now - _last_sweep < EXPORT_TTL / 10:
+        return
+    _last_sweep = now
+    for entry in os.scandir(EXPORT_DIR):
+        try:
+            if now - entry.stat().st_mtime > EXPORT_TTL:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def submit_export(fig, fmt, width=900, height=700):
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    _sweep()
+    key = export_key(fig, fmt, width, height)
+    if os.path.exists(_path(key, "bin")):
+        # Asked for again: keep it for another EXPORT_TTL
+        os.utime(_path(key, "bin"))
+        return key
+    # The status file, not process memory, says whether some worker is
+    # already on it; a lost job reads as an error and is submitted again
+    with _lock:
+        if export_status(key)["state"] in ("queued", "rendering"):
+            return key
+        _write_status(key, "queued", 0)
+    _executor.submit(_render, key, fig, fmt, width, height)
+    return key
+
+
+def export_status(key):
+    if os.path.exists(_path(key, "bin")):
+        return {"state": "done", "progress": 100, "error": None}
+    try:
+        with open(_path(key, "status"), encoding="utf-8") as f:
+            status = json.load(f)
+            age = time.time() - os.fstat(f.fileno()).st_mtime
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"state": "error", "progress": 100, "error": "export expired, please try again"}
+    if status["state"] in ("queued", "rendering") and age > EXPORT_JOB_TIMEOUT:
+        return {"state": "error", "progress": 100, "error": "export timed out, please try again"}
+    return status
+
+
+def export_result(key):
+    with open(_path(key, "bin"), "rb") as f:
+        return f.read()
+
+# ---------------------- DASH WIRING ----------------------
+def create_export_components(name):
+    return html.Div([
+        dcc.Store(id=f"export-job-{name}"),
+        dcc.Interval(id=f"export-poll-{name}", interval=EXPORT_POLL_MS, disabled=True),
+        html.Div(id=f"export-status-{name}", style={"margin": "10px 0"})
+    ])
+
+
+def register_export_callbacks(app, name, graph_id, exports):
+    # exports: [(button_id, download_id, format, filename), ...]
+    buttons = {button: (download, fmt, filename) for button, download, fmt, filename in exports}
+    downloads = [download for download, _, _ in buttons.values()]
+
+    @app.callback(
+        Output(f"export-job-{name}", "data"),
+        Output(f"export-poll-{name}", "disabled"),
+        Output(f"export-status-{name}", "children"),
+        *[Input(button, "n_clicks") for button in buttons],
+        State(graph_id, "figure"),
+        prevent_initial_call=True
+    )
+    @timed(f"export-submit-{name}")
+    def submit(*args):
+        fig = args[-1]
+        button = ctx.triggered_id
+        if button not in buttons or not ctx.triggered[0]["value"] or fig is None:
+            return no_update, no_update, no_update
+        download, fmt, filename = buttons[button]
+        key = submit_export(fig, fmt)
+        job = {"key": key, "download": download, "filename": filename}
+        return job, False, f"Preparing {filename}..."
+
+    @app.callback(
+        *[Output(download, "data") for download in downloads],
+        Output(f"export-poll-{name}", "disabled", allow_duplicate=True),
+        Output(f"export-status-{name}", "children", allow_duplicate=True),
+        Input(f"export-poll-{name}", "n_intervals"),
+        State(f"export-job-{name}", "data"),
+        prevent_initial_call=True
+    )
+    @timed(f"export-poll-{name}")
+    def poll(n, job):
+        idle = [no_update] * len(downloads)
+        if not job:
+            return *idle, True, no_update
+
+        status = export_status(job["key"])
+        if status["state"] == "error":
+            return *idle, True, f"Export failed: {status['error']}"
+        if status["state"] != "done":
+            return *idle, False, f"Preparing {job['filename']}... {status['progress']}%"
+
+        try:
+            data = export_result(job["key"])
+        except FileNotFoundError:
+            return *idle, True, "Export failed: export expired, please try again"
+        sends = [
+            dcc.send_bytes(data, job["filename"]) if download == job["download"]
+            else no_update
+            for download in downloads
+        ]
+        return *sends, True, ""
@@ -0,0 +1,162 @@
+# generate_data.py
+# Writes a synthetic dataset in the same layout as the bundled CSVs, for
+# load-testing at sizes the real data doesn't reach:
+#
+#   python generate_data.py /tmp/weather-big --cities 5000 --years 30
+#   WEATHER_DATA_DIR=/tmp/weather-big python app.py
+#
+# Distributions are fitted to the bundled forecasts (seasonal curve, city
+# offsets, noise, share of dry months per disaster). Rows are produced one
+# (year, block of cities) at a time and appended to the files, so memory use
+# doesn't grow with the output size.
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from data_store import DATA_DIR, COORDS_FILE, WEATHER_FILE, FORECAST_FILE_PATTERN
+
+# ---------------------- CONFIG ----------------------
+COUNTS_FILE = "above_threshold_counts.csv"
+FORECAST_COLUMNS = ["City", "Month", "Disaster", "Value", "Unit", "Threshold",
+                    "Above/Below", "Severity", "Scale", "Year"]
+CHUNK_CITIES = 256
+# Scale is 1-10; severity is its quarter
+SEVERITY_BINS = [3.25, 5.5, 7.75]
+SEVERITY_LABELS = np.array(["Low", "Medium", "High", "Very High"])
+
+# ---------------------- PROFILES ----------------------
+def fit_profiles(source_dir=DATA_DIR):
+    files = sorted(n for n in os.listdir(source_dir) if FORECAST_FILE_PATTERN.match(n))
+    df = pd.concat([pd.read_csv(os.path.join(source_dir, n)) for n in files], ignore_index=True)
+    df["Month_num"] = df["Month"].str[5:7].astype(int)
+
+    profiles = {}
+    for disaster, rows in df.groupby("Disaster", sort=False):
+        monthly = rows.groupby("Month_num")["Value"].mean().reindex(range(1, 13)).interpolate().to_numpy()
+        offsets = rows.groupby("City")["Value"].mean() - rows["Value"].mean()
+        residual = rows["Value"] - monthly[rows["Month_num"] - 1] - rows["City"].map(offsets)
+        slope, intercept = np.polyfit(rows["Value"], rows["Scale"], 1) if rows["Value"].nunique() > 1 else (0.0, 1.0)
+        low, high = rows["Value"].min(), rows["Value"].max()
+        margin = (high - low) * 0.1
+        profiles[disaster] = {
+            "unit": rows["Unit"].iloc[0],
+            "thresholds": rows.groupby("City")["Threshold"].first().to_numpy(),
+            "monthly": monthly,
+            "city_std": float(offsets.std(ddof=0)),
+            "noise_std": float(residual.std(ddof=0)),
+            "zero_share": float((rows["Value"] == 0).mean()),
+            "clip": (max(low - margin, 0.0) if low >= 0 else low - margin, high + margin),
+            "scale": (float(slope), float(intercept)),
+        }
+    coords = pd.read_csv(os.path.join(source_dir, COORDS_FILE))
+    return profiles, coords
+
+# ---------------------- GENERATION ----------------------
+def city_names(coords, count):
+    # Real cities first, then numbered synthetic ones
+    names = coords["City"].tolist()[:count]
+    width = len(str(count))
+    return names + [f"City {i:0{width}d}" for i in range(len(names), count)]
+
+
+def city_block(profiles, coords, names, start, seed):
+    # Per-city traits depend only on the seed and the city's position, so
+    # every year regenerates the same offsets and thresholds for a city.
+    rng = np.random.default_rng([seed, start])
+    count = len(names)
+    traits = {
+        disaster: (rng.normal(0, p["city_std"], count), rng.choice(p["thresholds"], count))
+        for disaster, p in profiles.items()
+    }
+    known = coords.set_index("City")
+    lat = np.where([n in known.index for n in names],
+                   [known["lat"].get(n, 0.0) for n in names], rng.uniform(-60, 70, count))
+    lon = np.where([n in known.index for n in names],
+                   [known["lon"].get(n, 0.0) for n in names], rng.uniform(-180, 180, count))
+    return traits, pd.DataFrame({"City": names, "lat": lat.round(2), "lon": lon.round(2)})
+
+
+def year_block(profiles, traits, names, year, start, seed):
+    rng = np.random.default_rng([seed, year, start])
+    count = len(names)
+    months = np.array([f"{year}-{m:02d}" for m in range(1, 13)])
+    frames = []
+    for disaster, p in profiles.items():
+        offsets, thresholds = traits[disaster]
+        values = p["monthly"][None, :] + offsets[:, None] + rng.normal(0, p["noise_std"], (count, 12))
+        values = np.clip(values, *p["clip"])
+        values[rng.random((count, 12)) < p["zero_share"]] = 0.0
+        slope, intercept = p["scale"]
+        scale = np.clip(slope * values + intercept, 1.0, 10.0)
+        threshold = np.repeat(thresholds, 12)
+        value = values.ravel()
+        frames.append(pd.DataFrame({
+            "City": np.repeat(names, 12),
+            "Month": np.tile(months, count),
+            "Disaster": disaster,
+            "Value": value,
+            "Unit": p["unit"],
+            "Threshold": threshold,
+            "Above/Below": np.where(value > threshold, "Above", "Below"),
+            "Severity": SEVERITY_LABELS[np.digitize(scale.ravel(), SEVERITY_BINS)],
+            "Scale": scale.ravel(),
+            "Year": year,
+            "_city": np.repeat(np.arange(count), 12),
+        }))
+    # Same row order as the bundled files: city, disaster, month
+    block = pd.concat(frames, ignore_index=True)
+    order = np.lexsort((np.arange(len(block)), block["_city"].to_numpy()))
+    return block.iloc[order].drop(columns="_city")
+
+
+def above_counts(block):
+    above = block[block["Above/Below"] == "Above"]
+    counts = above.groupby(["City", "Disaster", "Year"], sort=False).size()
+    return counts.rename("Count").reset_index()
+
+
+def generate(out_dir, cities, start_year, years, seed=0, chunk=CHUNK_CITIES, source_dir=DATA_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    profiles, coords = fit_profiles(source_dir)
+    names = city_names(coords, cities)
+    weather_path = os.path.join(out_dir, WEATHER_FILE)
+    counts_path = os.path.join(out_dir, COUNTS_FILE)
+    coords_path = os.path.join(out_dir, COORDS_FILE)
+
+    pd.DataFrame(columns=FORECAST_COLUMNS[:-1]).to_csv(weather_path, index=False)
+    pd.DataFrame(columns=["City", "Disaster", "Year", "Count"]).to_csv(counts_path, index=False)
+    pd.DataFrame(columns=["City", "lat", "lon"]).to_csv(coords_path, index=False)
+
+    rows = 0
+    for year in range(start_year, start_year + years):
+        year_path = os.path.join(out_dir, f"{year}.csv")
+        pd.DataFrame(columns=FORECAST_COLUMNS).to_csv(year_path, index=False)
+        for start in range(0, cities, chunk):
+            block_names = names[start:start + chunk]
+            traits, block_coords = city_block(profiles, coords, block_names, start, seed)
+            if year == start_year:
+                block_coords.to_csv(coords_path, mode="a", header=False, index=False)
+            block = year_block(profiles, traits, block_names, year, start, seed)
+            block.to_csv(year_path, mode="a", header=False, index=False)
+            block.drop(columns="Year").to_csv(weather_path, mode="a", header=False, index=False)
+            above_counts(block).to_csv(counts_path, mode="a", header=False, index=False)
+            rows += len(block)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic forecast dataset")
+    parser.add_argument("out_dir")
+    parser.add_argument("--cities", type=int, default=1000)
+    parser.add_argument("--start-year", type=int, default=2026)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-cities", type=int, default=CHUNK_CITIES)
+    args = parser.parse_args(argv)
+
+    rows = generate(args.out_dir, args.cities, args.start_year, args.years, args.seed, args.chunk_cities)
+    print(f"Wrote {rows} rows ({args.cities} cities x {args.years} years) to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# gunicorn.conf.py
+import os
+import gc
+import multiprocessing
+
+# ---------------------- SERVER ----------------------
+bind = f"0.0.0.0:{os.environ.get('PORT', 8050)}"
+
+cores = multiprocessing.cpu_count()
+workers = int(os.environ.get("WEB_CONCURRENCY", cores))
+# Threaded workers: Interval polls (map playback, export status) are many
+# short requests on kept-alive connections, and a sync worker would be tied
+# up by each one. Two threads per core (at least 4): most of those requests
+# are short, so the extra threads wait on I/O rather than the GIL.
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", max(4, 2 * cores)))
+keepalive = 5
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+
+# Recycle workers now and then so memory growth can't accumulate
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+
+# ---------------------- PRELOAD ----------------------
+# Import the app and load every dataset once in the master; workers share
+# those pages copy-on-write instead of each parsing the CSVs.
+preload_app = True
+
+# ---------------------- GRACEFUL RELOAD ----------------------
+# kill -HUP <master> replaces workers one by one after in-flight requests
+# finish (up to graceful_timeout). Data changes don't need a reload: each
+# worker's data watcher picks them up. For new code, send USR2 then QUIT to
+# the old master.
+graceful_timeout = 30
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG")
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    from data_store import preload
+    preload()
+    # Keep the preloaded objects out of the collector, so a collection in a
+    # worker doesn't touch (and copy) every shared page.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # A worker forked after a reload (max_requests, HUP) starts from the
+    # master's preload, which may be stale: catch up before serving
+    from data_store import refresh
+    try:
+        refresh()
+    except Exception:
+        server.log.exception("Data reload failed in worker %s", worker.pid)
+    # Threads don't survive fork, so each worker starts its own watcher
+    from data_watcher import start_data_watcher
+    start_data_watcher()
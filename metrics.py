@@ -0,0 +1,177 @@
+# metrics.py
+import os
+import json
+import time
+import logging
+import functools
+import threading
+from flask import Response, g, request, has_request_context
+
+# ---------------------- CONFIG ----------------------
+METRICS_PATH = os.environ.get("METRICS_PATH", "/metrics")
+# Log callbacks slower than this (with their inputs); 0 turns it off
+SLOW_CALLBACK_MS = float(os.environ.get("SLOW_CALLBACK_MS", 0))
+# Set to a directory to merge metrics from all gunicorn workers; otherwise
+# /metrics reports the worker that answered the scrape.
+METRICS_DIR = os.environ.get("METRICS_DIR")
+METRICS_FLUSH_SECONDS = 5
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000, 10_000_000)
+
+METRICS = {
+    "weather_callback_seconds": (TIME_BUCKETS, "Callback time by phase: build (callback body), serialize (response encoding and dispatch) and total"),
+    "weather_callback_response_bytes": (SIZE_BUCKETS, "Response body size per callback"),
+}
+
+log = logging.getLogger(__name__)
+# (metric, labels) -> [bucket counts..., +Inf count], sum
+_series = {}
+_lock = threading.Lock()
+_last_flush = 0.0
+
+# ---------------------- RECORDING ----------------------
+def observe(metric, labels, value):
+    buckets = METRICS[metric][0]
+    key = (metric, tuple(sorted(labels.items())))
+    with _lock:
+        counts, total = _series.get(key) or ([0] * (len(buckets) + 1), 0.0)
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        _series[key] = (counts, total + value)
+
+
+def timed(name):
+    # Times the callback body; the request hooks add serialization and size
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                elapsed = time.perf_counter() - start
+                if has_request_context():
+                    g.callback_name, g.callback_build = name, elapsed
+                else:
+                    observe("weather_callback_seconds", {"callback": name, "phase": "build"}, elapsed)
+        return wrapper
+    return decorator
+
+# ---------------------- EXPOSITION ----------------------
+def _snapshot():
+    with _lock:
+        return [[metric, dict(labels), list(counts), total]
+                for (metric, labels), (counts, total) in _series.items()]
+
+
+def _flush(force=False):
+    global _last_flush
+    now = time.monotonic()
+    if not METRICS_DIR or (not force and now - _last_flush < METRICS_FLUSH_SECONDS):
+        return
+    _last_flush = now
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"metrics-{os.getpid()}.json")
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_snapshot(), f)
+    os.replace(tmp, path)
+
+
+def _collect():
+    if not METRICS_DIR:
+        return _snapshot()
+    # Files of exited workers are kept, so counters never go backwards
+    _flush(force=True)
+    merged = {}
+    for name in os.listdir(METRICS_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, name), encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for metric, labels, counts, total in entries:
+            key = (metric, tuple(sorted(labels.items())))
+            if key in merged:
+                merged[key] = ([a + b for a, b in zip(merged[key][0], counts)], merged[key][1] + total)
+            else:
+                merged[key] = (counts, total)
+    return [[metric, dict(labels), counts, total] for (metric, labels), (counts, total) in merged.items()]
+
+
+def _escape(value):
+    # Pattern-matching callback ids are JSON, so quotes do occur
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, **extra):
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in {**labels, **extra}.items())
+
+
+def render_metrics():
+    # Prometheus text format; call rate is rate(<metric>_count[...])
+    lines = []
+    entries = sorted(_collect(), key=lambda e: (e[0], sorted(e[1].items())))
+    for metric, (buckets, help_text) in METRICS.items():
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} histogram")
+        for name, labels, counts, total in entries:
+            if name != metric:
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f"{metric}_bucket{{{_labels(labels, le=bound)}}} {cumulative}")
+            lines.append(f"{metric}_sum{{{_labels(labels)}}} {total}")
+            lines.append(f"{metric}_count{{{_labels(labels)}}} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+# ---------------------- FLASK WIRING ----------------------
+def _request_name():
+    if request.path.endswith("/_dash-update-component"):
+        body = request.get_json(silent=True) or {}
+        return body.get("output", "unknown")
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+def register_metrics(app):
+    server = app.server
+
+    @server.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def record(response):
+        start = g.pop("metrics_start", None)
+        if start is None or request.path == METRICS_PATH:
+            return response
+        total = time.perf_counter() - start
+        name = g.get("callback_name") or _request_name()
+        build = g.get("callback_build")
+
+        observe("weather_callback_seconds", {"callback": name, "phase": "total"}, total)
+        if build is not None:
+            observe("weather_callback_seconds", {"callback": name, "phase": "build"}, build)
+            observe("weather_callback_seconds", {"callback": name, "phase": "serialize"}, max(total - build, 0.0))
+        if response.content_length is not None:
+            observe("weather_callback_response_bytes", {"callback": name}, response.content_length)
+
+        if SLOW_CALLBACK_MS and total * 1000 >= SLOW_CALLBACK_MS:
+            body = request.get_json(silent=True) or {}
+            inputs = json.dumps({"inputs": body.get("inputs"), "state": body.get("state")}, default=str)
+            log.warning("Slow request %s: %.0f ms, %s bytes, %s",
+                        name, total * 1000, response.content_length, inputs[:2000])
+        _flush()
+        return response
+
+    @server.route(METRICS_PATH)
+    def metrics():
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
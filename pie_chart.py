@@ -1,16 +1,20 @@
-from dash import html, dcc, Input, Output, State, no_update
+from dash import html, dcc, Input, Output, State, Patch, ctx
 import dash_bootstrap_components as dbc
 import plotly.express as px
-import plotly.io as pio
 import pandas as pd
-
-df_pie = pd.read_csv("above_threshold_counts.csv")
+from cache import figure_cache
+from metrics import timed
+from compact import compact_outputs
+from data_store import get_threshold_cube, on_reload, affects
+from exports import create_export_components, register_export_callbacks
+from bar_charts import disaster_colors
 
 
 def create_pie_layout():
-    years = sorted(df_pie["Year"].unique())
-    cities = sorted(df_pie["City"].unique())
-    disasters = sorted(df_pie["Disaster"].unique())
+    cube = get_threshold_cube()
+    years = cube.years()
+    cities = cube.cities()
+    disasters = cube.disasters()
 
     return html.Div([
         html.H2("Pie Chart: Weather Events Above Threshold"),
@@ -37,55 +41,96 @@ def create_pie_layout():
         ),
 
         dcc.Graph(id="pie-chart"),
+        dcc.Store(id="pie-last"),
 
         dbc.Button("Download PDF", id="btn-pdf-pie", color="danger", style={"margin-top": "10px"}),
 
-        dcc.Download(id="download-pdf-pie")
+        dcc.Download(id="download-pdf-pie"),
+        create_export_components("pie")
     ])
 
 
-def register_pie_callbacks(app):
+def pie_counts(city, year, disasters):
+    counts = get_threshold_cube().counts(city, year, disasters)
+    # Disasters that never crossed their threshold get no slice
+    return {disaster: count for disaster, count in counts.items() if count}
 
-    @app.callback(
-        Output("pie-chart", "figure"),
-        Input("city-dropdown-pie", "value"),
-        Input("year-dropdown-pie", "value"),
-        Input("disaster-checkbox-pie", "value")
+
+def pie_figure(city, year, counts):
+    fig = px.pie(
+        pd.DataFrame({"Disaster": list(counts), "Count": list(counts.values())}),
+        values="Count",
+        names="Disaster",
+        color="Disaster",
+        color_discrete_map=disaster_colors(),
+        title=f"Weather Conditions Above Threshold for {city} in {year}"
     )
-    def update_pie_chart(city, year, disasters):
+    fig.update_traces(textposition="inside", textinfo="percent+label")
+    return fig
+
+
+def create_pie_figure(city, year, disasters):
+    if not city or not year or not disasters:
+        return px.pie(title="No data selected")
 
-        if not city or not year or not disasters:
-            return px.pie(title="No data selected")
+    counts = pie_counts(city, year, disasters)
+    if not counts:
+        return px.pie(title="No data available for selection")
 
-        df_filtered = df_pie[
-            (df_pie["City"] == city) &
-            (df_pie["Year"] == year) &
-            (df_pie["Disaster"].isin(disasters))
-        ]
+    return pie_figure(city, year, counts)
 
-        if df_filtered.empty:
-            return px.pie(title="No data available for selection")
 
-        fig = px.pie(
-            df_filtered,
-            values="Count",
-            names="Disaster",
-            title=f"Weather Conditions Above Threshold for {city} in {year}"
-        )
-        fig.update_traces(textposition="inside", textinfo="percent+label")
+def patch_pie_chart(city, year, disasters):
+    # Same city and year: only the slices change, so send just the slice
+    # arrays and keep the layout the browser already has
+    counts = pie_counts(city, year, disasters)
+    if not counts:
+        return None
+    colors = disaster_colors()
+    # The same arrays px.pie(color="Disaster") produces, without building a figure
+    patch = Patch()
+    patch["data"][0]["labels"] = list(counts)
+    patch["data"][0]["values"] = list(counts.values())
+    patch["data"][0]["customdata"] = [[disaster] for disaster in counts]
+    patch["data"][0]["marker"] = {"colors": [colors[disaster] for disaster in counts]}
+    return patch
 
-        return fig
 
+@figure_cache.memoize("pie")
+@compact_outputs
+def build_pie_chart(city, year, disasters):
+    return create_pie_figure(city, year, disasters)
+
+
+def register_pie_callbacks(app):
 
-    # ---- DOWNLOAD PDF (FIXED) ----
     @app.callback(
-        Output("download-pdf-pie", "data"),
-        Input("btn-pdf-pie", "n_clicks"),
-        State("pie-chart", "figure"),
-        prevent_initial_call=True
+        Output("pie-chart", "figure"),
+        Output("pie-last", "data"),
+        Input("city-dropdown-pie", "value"),
+        Input("year-dropdown-pie", "value"),
+        Input("disaster-checkbox-pie", "value"),
+        State("pie-last", "data")
     )
-    def download_pdf_pie(n, fig):
-        if not n or fig is None:
-            return no_update
-        pdf_bytes = pio.to_image(fig, format="pdf", width=900, height=700)
-        return dcc.send_bytes(pdf_bytes, "pie_chart.pdf")
+    @timed("pie")
+    def update_pie_chart(city, year, disasters, last):
+        state = {"city": city, "year": year, "disasters": disasters}
+        if (ctx.triggered_id == "disaster-checkbox-pie" and last and last.get("slices")
+                and last["city"] == city and last["year"] == year):
+            patch = patch_pie_chart(city, year, disasters)
+            if patch is not None:
+                return patch, {**state, "slices": True}
+
+        fig = build_pie_chart(city, year, disasters)
+        return fig, {**state, "slices": bool(fig["data"]) and "labels" in fig["data"][0]}
+
+
+    # ---- DOWNLOAD PDF (rendered off the request thread) ----
+    register_export_callbacks(app, "pie", "pie-chart", [
+        ("btn-pdf-pie", "download-pdf-pie", "pdf", "pie_chart.pdf"),
+    ])
+
+    @on_reload
+    def invalidate(changes):
+        pairs = changes.get("disasters", set())
+        figure_cache.invalidate("pie", lambda city, year, disasters: affects(pairs, city, year))
@@ -0,0 +1,137 @@
+# report.py
+import io
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from flask import request, send_file, abort
+import plotly.graph_objects as go
+import plotly.io as pio
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from bar_charts import create_bar_figure
+from pie_chart import create_pie_figure
+from surface_plots import create_subplot_figure
+from rr import map_frames, create_map_figure
+from data_store import get_weather
+from data_export import list_arg
+
+# ---------------------- CONFIG ----------------------
+# Render processes per server process, each keeping a Chrome instance alive
+# once it has rendered a report. Under gunicorn every worker gets its own
+# pool, so the total is WEB_CONCURRENCY x REPORT_WORKERS. Reports render
+# inside the request, so a large one must still finish within the gunicorn
+# timeout (GUNICORN_TIMEOUT).
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", 2))
+# One page per city and year; larger requests are refused rather than left
+# to run into the timeout
+REPORT_MAX_PAGES = int(os.environ.get("REPORT_MAX_PAGES", 12))
+CHART_WIDTH = 900
+CHART_HEIGHT = 600
+
+_pool = None
+
+# ---------------------- RENDER WORKERS ----------------------
+def _warm_kaleido():
+    # Keep one Kaleido/Chrome instance alive per worker process instead of
+    # starting it for every chart.
+    # A plain render first: without Chrome it fails fast, whereas the sync
+    # server's thread dies silently and later renders would hang.
+    try:
+        pio.to_image(go.Figure(), format="png")
+        import kaleido
+        kaleido.start_sync_server(silence_warnings=True)
+    except Exception:
+        pass
+
+
+def report_figures(city, year, month=1):
+    disasters = list(get_weather()["Disaster"].cat.categories)
+    bar, _ = create_bar_figure([city], year, disasters)
+    return [
+        ("Forecast", bar),
+        ("Above threshold", create_pie_figure(city, year, disasters)),
+        ("Weather scaling", create_subplot_figure(city)),
+        ("Map", create_map_figure(map_frames(year, city)[month - 1], city)),
+    ]
+
+
+def render_report_page(args):
+    city, year, month = args
+    charts = []
+    for title, fig in report_figures(city, year, month):
+        try:
+            charts.append((title, pio.to_image(fig, format="png", width=CHART_WIDTH, height=CHART_HEIGHT), None))
+        except Exception as e:
+            charts.append((title, None, str(e)))
+    return city, year, charts
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        # spawn: the parent is usually a threaded server process
+        _pool = ProcessPoolExecutor(
+            max_workers=REPORT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_kaleido
+        )
+    return _pool
+
+# ---------------------- PDF ----------------------
+def build_report(cities, years, month=1):
+    pages = [(city, year, month) for city in cities for year in years]
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=landscape(A4))
+    page_width, page_height = landscape(A4)
+    cell_width, cell_height = page_width / 2, (page_height - 40) / 2
+
+    # Pages come back in submission order while rendering runs in parallel
+    for city, year, charts in get_pool().map(render_report_page, pages):
+        pdf.setFont("Helvetica-Bold", 16)
+        pdf.drawString(20, page_height - 28, f"{city} — {year}")
+        for i, (title, png, error) in enumerate(charts):
+            x = (i % 2) * cell_width
+            y = page_height - 40 - (i // 2 + 1) * cell_height
+            if png is not None:
+                pdf.drawImage(ImageReader(io.BytesIO(png)), x + 5, y + 5,
+                              width=cell_width - 10, height=cell_height - 10,
+                              preserveAspectRatio=True)
+            else:
+                pdf.setFont("Helvetica", 10)
+                pdf.drawString(x + 10, y + cell_height / 2, f"{title}: chart unavailable ({error[:80]})")
+        pdf.showPage()
+
+    pdf.save()
+    buffer.seek(0)
+    return buffer
+
+# ---------------------- ROUTE ----------------------
+def register_report_routes(app):
+
+    @app.server.route("/report.pdf")
+    def batch_report():
+        df_weather = get_weather()
+        known_cities = set(df_weather["City"].cat.categories)
+        known_years = set(df_weather["Year"].unique().tolist())
+
+        cities = list_arg("cities")
+        try:
+            years = [int(y) for y in list_arg("years")]
+            month = int(request.args.get("month", 1))
+        except ValueError:
+            abort(400, "years and month must be integers")
+
+        if not cities or not years:
+            abort(400, "cities and years are required")
+        if len(cities) * len(years) > REPORT_MAX_PAGES:
+            abort(400, f"At most {REPORT_MAX_PAGES} pages (cities x years) per report")
+
+        unknown = [c for c in cities if c not in known_cities] + [y for y in years if y not in known_years]
+        if unknown:
+            abort(400, f"Unknown cities/years: {unknown}")
+        if not 1 <= month <= 12:
+            abort(400, "month must be between 1 and 12")
+
+        return send_file(build_report(cities, years, month), mimetype="application/pdf",
+                         as_attachment=True, download_name="weather_report.pdf")
@@ -1,2 +1,2 @@
 #!/bin/bash
-gunicorn app:server --bind 0.0.0.0:$PORT
+gunicorn app:server --config gunicorn.conf.py
@@ -1,8 +1,12 @@
+import os
+import numpy as np
 from dash import html, dcc, Input, Output
 import plotly.express as px
-import pandas as pd
-
-df_weather = pd.read_csv("predicted_crime_corrected.csv")
+import plotly.graph_objects as go
+from cache import figure_cache
+from metrics import timed
+from compact import compact_outputs
+from data_store import get_weather_options, get_weather_index, severity_order, on_reload, affects
 
 severity_colors = {
     "Low": "green",
@@ -11,75 +15,194 @@ severity_colors = {
     "Very High": "blue"
 }
 
-severity_order = ["Low", "Medium", "High", "Very High"]
+# ---------------------- CONFIG ----------------------
+# Past this many points the surface plot bins months (and, if needed, groups
+# cities) instead of sending every row to the browser.
+SURFACE_POINT_LIMIT = int(os.environ.get("SURFACE_POINT_LIMIT", 2000))
+SURFACE_BIN_WIDTHS = [1, 3, 6, 12]
 
 def create_surface_layout():
+    options = get_weather_options()
+    cities, disasters = options["cities"], options["disasters"]
     return html.Div([
         html.H2("3D Surface Plots: Weather Data"),
         dcc.Dropdown(
             id="surface-city-dropdown",
-            options=[{"label": city, "value": city} for city in df_weather["City"].unique()],
-            value=[df_weather["City"].unique()[0]],
+            options=[{"label": city, "value": city} for city in cities],
+            value=[cities[0]],
             multi=True,
             style={"width": "50%"}
         ),
         dcc.Dropdown(
             id="surface-weather-dropdown",
-            options=[{"label": weather, "value": weather} for weather in df_weather["Disaster"].unique()],
-            value=df_weather["Disaster"].unique()[0],
+            options=[{"label": weather, "value": weather} for weather in disasters],
+            value=disasters[0],
             style={"width": "50%"}
         ),
+        dcc.RadioItems(
+            id="surface-mode",
+            options=[{"label": "Auto", "value": "auto"},
+                     {"label": "Points", "value": "points"},
+                     {"label": "Surface", "value": "surface"}],
+            value="auto",
+            inline=True,
+            style={"margin": "8px 0"}
+        ),
+        dcc.Dropdown(
+            id="surface-bins",
+            options=[{"label": "Automatic bins", "value": 0}] +
+                    [{"label": f"{width}-month bins" if width > 1 else "Monthly", "value": width}
+                     for width in SURFACE_BIN_WIDTHS],
+            value=0,
+            clearable=False,
+            style={"width": "30%"}
+        ),
         dcc.Graph(id="surface-plot"),
         html.H3("3D Subplots: Weather Scaling by City"),
         dcc.Dropdown(
             id="subplot-city-dropdown",
-            options=[{"label": city, "value": city} for city in df_weather["City"].unique()],
-            value=df_weather["City"].unique()[0],
+            options=[{"label": city, "value": city} for city in cities],
+            value=cities[0],
             style={"width": "50%"}
         ),
         dcc.Graph(id="subplot-3d")
     ])
 
+
+def bin_width(cities, months, limit=SURFACE_POINT_LIMIT):
+    # Narrowest month bin that keeps the grid within the point limit
+    for width in SURFACE_BIN_WIDTHS:
+        if cities * -(-months // width) <= limit:
+            return width
+    return SURFACE_BIN_WIDTHS[-1]
+
+
+def surface_grid(df, width=0, limit=SURFACE_POINT_LIMIT):
+    # City x Month matrix of mean Value, binned so it has at most `limit` cells
+    grid = df.pivot_table(index="City", columns="Month", values="Value", aggfunc="mean", observed=True)
+    months = list(grid.columns)
+    width = width or bin_width(len(grid), len(months), limit)
+
+    if width > 1:
+        starts = range(0, len(months), width)
+        grid = grid.T.groupby(np.arange(len(months)) // width).mean().T
+        grid.columns = [f"{months[i]}..{months[min(i + width, len(months)) - 1]}" for i in starts]
+
+    # Too many cities for even the widest bins: average cities of similar
+    # level into bands
+    max_rows = max(1, limit // max(1, grid.shape[1]))
+    if len(grid) > max_rows:
+        grid = grid.loc[grid.mean(axis=1).sort_values().index]
+        bands = np.arange(len(grid)) * max_rows // len(grid)
+        names = grid.index.to_series().groupby(bands)
+        labels = [f"{first} .. {last} ({count})" for first, last, count in
+                  zip(names.first(), names.last(), names.size())]
+        grid = grid.groupby(bands).mean()
+        grid.index = labels
+    return grid, width
+
+
+def create_surface_figure(cities, weather, mode="auto", bins=0):
+    # A cleared dropdown is None, which select() would treat as "no filter"
+    if not cities or not weather:
+        return px.scatter_3d(title="No data selected")
+
+    df_filtered = get_weather_index().select(City=cities, Disaster=weather)
+
+    if df_filtered.empty:
+        return px.scatter_3d(title="No data selected")
+
+    if mode == "surface" or (mode == "auto" and len(df_filtered) > SURFACE_POINT_LIMIT):
+        grid, width = surface_grid(df_filtered, bins)
+        label = "monthly" if width == 1 else f"{width}-month means"
+        # go.Surface needs at least a 2x2 grid (one city draws nothing)
+        if mode == "surface" and min(grid.shape) >= 2:
+            fig = go.Figure(go.Surface(
+                z=grid.to_numpy(),
+                x=list(range(grid.shape[1])),
+                y=list(range(grid.shape[0])),
+                colorscale="Viridis",
+                hovertemplate="%{z:.2f}<extra></extra>"
+            ))
+            fig.update_layout(
+                title=f"3D Surface: {weather} by City ({label})",
+                scene=dict(
+                    xaxis=dict(title="Month", tickvals=list(range(grid.shape[1])), ticktext=list(grid.columns)),
+                    yaxis=dict(title="City", tickvals=list(range(grid.shape[0])), ticktext=list(grid.index)),
+                    zaxis=dict(title="Value")
+                )
+            )
+            return fig
+
+        points = grid.stack().rename("Value").reset_index()
+        points.columns = ["City", "Month", "Value"]
+        return px.scatter_3d(
+            points,
+            x="Month",
+            y="City",
+            z="Value",
+            color="Value",
+            title=f"3D Surface: {weather} by City ({label})"
+        )
+
+    fig = px.scatter_3d(
+        df_filtered,
+        x="Month",
+        y="City",
+        z="Value",
+        color="Severity",
+        category_orders={"Severity": severity_order},
+        color_discrete_map=severity_colors,
+        title=f"3D Surface: {weather} by City"
+    )
+    return fig
+
+
+def create_subplot_figure(city):
+    if not city:
+        return px.scatter_3d(title="No data selected")
+
+    df_filtered = get_weather_index().select(City=city)
+
+    fig = px.scatter_3d(
+        df_filtered,
+        x="Month",
+        y="Disaster",
+        z="Scale",
+        color="Severity",
+        category_orders={"Severity": severity_order},
+        color_discrete_map=severity_colors,
+        title=f"3D Subplot: Weather Scaling for {city}"
+    )
+    return fig
+
 def register_surface_callbacks(app):
 
     @app.callback(
         Output("surface-plot", "figure"),
         Input("surface-city-dropdown", "value"),
-        Input("surface-weather-dropdown", "value")
+        Input("surface-weather-dropdown", "value"),
+        Input("surface-mode", "value"),
+        Input("surface-bins", "value")
     )
-    def update_surface_plot(cities, weather):
-        df_filtered = df_weather[
-            (df_weather["City"].isin(cities)) &
-            (df_weather["Disaster"] == weather)
-        ]
-
-        fig = px.scatter_3d(
-            df_filtered,
-            x="Month",
-            y="City",
-            z="Value",
-            color="Severity",
-            category_orders={"Severity": severity_order},
-            color_discrete_map=severity_colors,
-            title=f"3D Surface: {weather} by City"
-        )
-        return fig
+    @timed("surface")
+    @figure_cache.memoize("surface")
+    @compact_outputs
+    def update_surface_plot(cities, weather, mode, bins):
+        return create_surface_figure(cities, weather, mode, bins)
 
     @app.callback(
         Output("subplot-3d", "figure"),
         Input("subplot-city-dropdown", "value")
     )
+    @timed("subplot-3d")
+    @figure_cache.memoize("subplot-3d")
+    @compact_outputs
     def update_subplot_3d(city):
-        df_filtered = df_weather[df_weather["City"] == city]
+        return create_subplot_figure(city)
 
-        fig = px.scatter_3d(
-            df_filtered,
-            x="Month",
-            y="Disaster",
-            z="Scale",
-            color="Severity",
-            category_orders={"Severity": severity_order},
-            color_discrete_map=severity_colors,
-            title=f"3D Subplot: Weather Scaling for {city}"
-        )
-        return fig
+    @on_reload
+    def invalidate(changes):
+        pairs = changes.get("weather", set())
+        figure_cache.invalidate("surface", lambda cities, weather, mode, bins: affects(pairs, cities))
+        figure_cache.invalidate("subplot-3d", lambda city: affects(pairs, city))
@@ -0,0 +1,59 @@
+# test_cleared_dropdowns.py
+# A cleared Dash dropdown sends None (or []). SliceIndex.select() reads None
+# as "no filter", so every figure builder has to turn it into an empty plot
+# itself rather than plotting the whole dataset.
+#
+#   python -m pytest -q
+import pytest
+from bar_charts import create_bar_figure
+from pie_chart import create_pie_figure
+from surface_plots import create_surface_figure, create_subplot_figure
+from rr import map_frames
+
+
+def points(fig):
+    return sum(len(trace.x) for trace in fig.data if trace.x is not None)
+
+
+@pytest.mark.parametrize("cities, weather", [
+    (None, "Flood"), ([], "Flood"), (["London"], None), (None, None),
+])
+@pytest.mark.parametrize("mode", ["auto", "points", "surface"])
+def test_surface_cleared(cities, weather, mode):
+    fig = create_surface_figure(cities, weather, mode, 0)
+    assert fig.layout.title.text == "No data selected"
+    assert points(fig) == 0
+
+
+@pytest.mark.parametrize("city", [None, ""])
+def test_subplot_cleared(city):
+    fig = create_subplot_figure(city)
+    assert fig.layout.title.text == "No data selected"
+    assert points(fig) == 0
+
+
+@pytest.mark.parametrize("cities, year, disasters", [
+    (None, 2027, ["Flood"]), (["London"], None, ["Flood"]), (["London"], 2027, None), (["London"], 2027, []),
+])
+def test_bar_cleared(cities, year, disasters):
+    fig, writeup = create_bar_figure(cities, year, disasters)
+    assert fig.layout.title.text == "No data selected"
+    assert writeup == ""
+
+
+@pytest.mark.parametrize("city, year, disasters", [
+    (None, 2027, ["Flood"]), ("London", None, ["Flood"]), ("London", 2027, None),
+])
+def test_pie_cleared(city, year, disasters):
+    assert create_pie_figure(city, year, disasters).layout.title.text == "No data selected"
+
+
+@pytest.mark.parametrize("year, city", [(None, "All"), (2027, None), (2027, "")])
+def test_map_cleared(year, city):
+    assert all(not frame["lat"] for frame in map_frames(year, city))
+
+
+def test_selection_still_plots():
+    assert points(create_surface_figure(["London"], "Flood", "points", 0)) == 60
+    assert points(create_subplot_figure("London")) == 300
+    assert any(frame["lat"] for frame in map_frames(2027, "All"))
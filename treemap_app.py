@@ -1,7 +1,10 @@
+import os
 import dash
-from dash import html, dcc, Input, Output, State
+from dash import html, dcc, Input, Output, State, no_update
 import plotly.graph_objects as go
-import pandas as pd
+from metrics import timed
+from compact import compact_figure
+from data_store import get_hierarchy, on_reload
 
 # Define color mapping for severity
 severity_colors = {
@@ -12,7 +15,8 @@ severity_colors = {
 }
 
 # Available years
-available_years = ["2026", "2027", "2028", "2029", "2030"]
+def available_years():
+    return list(get_hierarchy())
 
 
 def create_treemap_layout():
@@ -31,10 +35,11 @@ def create_treemap_layout():
 
 
 def create_year_treemap():
+    years = available_years()
     fig = go.Figure(go.Treemap(
-        labels=available_years,
-        parents=[""] * len(available_years),
-        values=[1] * len(available_years),
+        labels=years,
+        parents=[""] * len(years),
+        values=[1] * len(years),
         hoverinfo="none"   # 👈 NO HOVER
     ))
     fig.update_layout(title="Select Year", margin=dict(t=40, l=0, r=0, b=0))
@@ -54,9 +59,7 @@ def create_month_treemap(year):
 
 
 def create_city_treemap(year, month):
-    df = pd.read_csv(f"{year}.csv")
-    df = df[df["Month"] == month]
-    cities = df["City"].unique().tolist()
+    cities = list(get_hierarchy().get(str(year), {}).get(month, {}))
 
     fig = go.Figure(go.Treemap(
         labels=[month] + cities,
@@ -69,16 +72,15 @@ def create_city_treemap(year, month):
 
 
 def create_disaster_treemap(year, month, city):
-    df = pd.read_csv(f"{year}.csv")
-    df = df[(df["Month"] == month) & (df["City"] == city)]
+    records = get_hierarchy().get(str(year), {}).get(month, {}).get(city, [])
 
-    labels = [city] + df["Disaster"].tolist()
-    parents = [""] + [city] * len(df)
-    values = [1] * (len(df) + 1)
+    labels = [city] + [disaster for disaster, *_ in records]
+    parents = [""] + [city] * len(records)
+    values = [1] * (len(records) + 1)
 
-    colors = ["lightgrey"] + [severity_colors.get(s, "grey") for s in df["Severity"].tolist()]
+    colors = ["lightgrey"] + [severity_colors.get(severity, "grey") for _, _, _, severity, _ in records]
 
-    customdata = [["", "", "", ""]] + df[["Value", "Unit", "Severity", "Scale"]].values.tolist()
+    customdata = [["", "", "", ""]] + [[value, unit, severity, scale] for _, value, unit, severity, scale in records]
 
     fig = go.Figure(go.Treemap(
         labels=labels,
@@ -99,8 +101,87 @@ def create_disaster_treemap(year, month, city):
     return fig
 
 
+# ---------------------- PREBUILT FIGURES ----------------------
+# The drill-down has a closed state space (years x months x cities), so each
+# figure is built once and kept; set TREEMAP_PREBUILD=1 to build them all at
+# startup instead of on first click.
+TREEMAP_PREBUILD = os.environ.get("TREEMAP_PREBUILD", "0") == "1"
+
+_builders = {
+    "year": create_year_treemap,
+    "month": create_month_treemap,
+    "city": create_city_treemap,
+    "disaster": create_disaster_treemap,
+}
+_figures = {}
+
+
+def get_treemap(key):
+    figure = _figures.get(key)
+    if figure is None:
+        kind, *args = key
+        figure = _figures[key] = compact_figure(_builders[kind](*args))
+    return figure
+
+
+@on_reload
+def drop_treemaps(changes):
+    # Rebuild the year picker and every figure under a reloaded year
+    years = {str(year) for year, _ in changes.get("disasters", set())}
+    if years:
+        for key in [k for k in _figures if k == ("year",) or (len(k) > 1 and k[1] in years)]:
+            _figures.pop(key, None)
+
+
+def prebuild_treemaps():
+    get_treemap(("year",))
+    for year, months in get_hierarchy().items():
+        get_treemap(("month", year))
+        for month, cities in months.items():
+            get_treemap(("city", year, month))
+            for city in cities:
+                get_treemap(("disaster", year, month, city))
+
+
+def figure_keys(year, month, city):
+    # What each graph shows for a given (year, month, city) selection
+    return (
+        ("year",),
+        ("month", year) if year else None,
+        ("city", year, month) if month else None,
+        ("disaster", year, month, city) if city else None,
+    )
+
+
+def visible_level(year, month, city):
+    return 3 if city else 2 if month else 1 if year else 0
+
+
+def transition(old, new, initial=False):
+    # Hidden graphs may keep stale figures; whenever a level is selected its
+    # graph already shows that selection, so only changed outputs are sent.
+    stores = [value if initial or value != previous else no_update
+              for value, previous in zip(new, old)]
+
+    figures = [
+        get_treemap(key) if key is not None and (initial or key != previous) else no_update
+        for key, previous in zip(figure_keys(*new), figure_keys(*old))
+    ]
+
+    old_level, new_level = visible_level(*old), visible_level(*new)
+    styles = [
+        {"display": "block" if i == new_level else "none"}
+        if initial or (old_level != new_level and i in (old_level, new_level)) else no_update
+        for i in range(4)
+    ]
+    return (*stores, *figures, *styles)
+
+
 def register_treemap_callbacks(app):
 
+    if TREEMAP_PREBUILD:
+        prebuild_treemaps()
+
     @app.callback(
         Output("selected-year", "data"),
         Output("selected-month", "data"),
@@ -125,48 +206,43 @@ def register_treemap_callbacks(app):
         State("selected-month", "data"),
         State("selected-city", "data"),
     )
+    @timed("treemap-navigation")
     def navigation(year_click, month_click, city_click, disaster_click, year, month, city):
 
         ctx = dash.callback_context
+        current = (year, month, city)
         if not ctx.triggered:
-            return None, None, None, create_year_treemap(), go.Figure(), go.Figure(), go.Figure(), \
-                   {"display": "block"}, {"display": "none"}, {"display": "none"}, {"display": "none"}
+            return transition(current, (None, None, None), initial=True)
 
         trigger = ctx.triggered[0]["prop_id"].split(".")[0]
 
         # --- Year Click ---
         if trigger == "year-treemap" and year_click:
             label = year_click["points"][0]["label"]
-            return label, None, None, create_year_treemap(), create_month_treemap(label), go.Figure(), go.Figure(), \
-                   {"display": "none"}, {"display": "block"}, {"display": "none"}, {"display": "none"}
+            return transition(current, (label, None, None))
 
         # --- Month Click ---
         if trigger == "month-treemap" and month_click:
             label = month_click["points"][0]["label"]
-            if label in available_years:
-                return None, None, None, create_year_treemap(), go.Figure(), go.Figure(), go.Figure(), \
-                       {"display": "block"}, {"display": "none"}, {"display": "none"}, {"display": "none"}
+            if label in available_years():
+                return transition(current, (None, None, None))
 
-            return year, label, None, create_year_treemap(), create_month_treemap(year), create_city_treemap(year, label), go.Figure(), \
-                   {"display": "none"}, {"display": "none"}, {"display": "block"}, {"display": "none"}
+            return transition(current, (year, label, None))
 
         # --- City Click ---
         if trigger == "city-treemap" and city_click:
             label = city_click["points"][0]["label"]
 
             if label == month:
-                return year, None, None, create_year_treemap(), create_month_treemap(year), go.Figure(), go.Figure(), \
-                       {"display": "none"}, {"display": "block"}, {"display": "none"}, {"display": "none"}
+                return transition(current, (year, None, None))
 
-            return year, month, label, create_year_treemap(), create_month_treemap(year), create_city_treemap(year, month), create_disaster_treemap(year, month, label), \
-                   {"display": "none"}, {"display": "none"}, {"display": "none"}, {"display": "block"}
+            return transition(current, (year, month, label))
 
         # --- Disaster Click (Back to City) ---
         if trigger == "disaster-treemap" and disaster_click:
             label = disaster_click["points"][0]["label"]
 
             if label == city:
-                return year, month, None, create_year_treemap(), create_month_treemap(year), create_city_treemap(year, month), go.Figure(), \
-                       {"display": "none"}, {"display": "none"}, {"display": "block"}, {"display": "none"}
+                return transition(current, (year, month, None))
 
         raise dash.exceptions.PreventUpdate